@@ -0,0 +1,247 @@
+"""
+Admission control for the CPU-heavy auth routes.
+
+Every bcrypt call on /auth/login and /auth/signup costs a core for a third
+of a second, so a burst of them can starve the cheap endpoints on the same
+worker. Before such a request reaches its route it has to pass:
+
+- token buckets keyed by client IP and by the email in the body, shared
+  between workers when ADMISSION_BACKEND is ``redis``; an empty bucket is
+  a ``429`` with the seconds until the next token in Retry-After;
+- a per-route concurrency limit of this worker with a short, bounded wait
+  queue; a full queue or a wait longer than ADMISSION_QUEUE_TIMEOUT is a
+  ``503`` with Retry-After.
+"""
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import NamedTuple, Optional
+from starlette.concurrency import run_in_threadpool
+from app import metrics
+from app.settings import get_settings
+
+settings = get_settings()
+
+class Rule(NamedTuple):
+    concurrency: int
+    queue: int
+    queue_timeout: float
+    # (bucket capacity, tokens per second), or None for no limit
+    ip_rate: Optional[tuple] = None
+    email_rate: Optional[tuple] = None
+
+class Rejection(NamedTuple):
+    status: int
+    reason: str
+    retry_after: int
+
+def parse_rate(rate: str):
+    """``"10/60"`` (10 requests per 60 seconds, in bursts of up to 10) as (capacity, tokens per second); None for ``off``"""
+    if not rate or rate.lower() == "off":
+        return None
+    count, seconds = rate.split("/")
+    return int(count), int(count) / float(seconds)
+
+def take_token(state, capacity: int, rate: float, now: float):
+    """
+    Refill a bucket from its ``(tokens, updated)`` state (None when new) and
+    take a token from it. Returns the new state and the seconds until a
+    token is available, 0 when one was taken.
+    """
+    tokens, updated = state if state else (capacity, now)
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / rate
+
+class MemoryBuckets:
+    """Token buckets of this process, the least recently used dropped beyond ``maxsize``"""
+    blocking = False
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, now: float) -> float:
+        with self._lock:
+            self._buckets[key], retry_after = take_token(self._buckets.get(key), capacity, rate, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+class RedisBuckets:
+    """
+    Token buckets in Redis hashes, shared by every worker.
+
+    Each take is a WATCH/MULTI transaction that redis-py retries if another
+    worker changed the bucket in between; buckets expire once they would
+    be full again. ``client`` is anything with the redis-py ``transaction``
+    method whose pipeline has ``hmget``/``multi``/``hset``/``pexpire``.
+    """
+    blocking = True
+
+    def __init__(self, client=None, prefix: str = "admission:"):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(settings.admission_redis_url)
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key: str, capacity: int, rate: float, now: float) -> float:
+        name = self.prefix + key
+
+        def attempt(pipe):
+            tokens, updated = pipe.hmget(name, "tokens", "updated")
+            state = None if tokens is None else (float(tokens), float(updated))
+            (tokens, updated), retry_after = take_token(state, capacity, rate, now)
+            pipe.multi()
+            pipe.hset(name, mapping={"tokens": tokens, "updated": updated})
+            pipe.pexpire(name, math.ceil(capacity / rate * 1000))
+            return retry_after
+
+        return self.client.transaction(attempt, name, value_from_callable=True)
+
+    def clear(self):
+        pass
+
+class ConcurrencyLimit:
+    """
+    At most ``limit`` admitted requests at a time; up to ``queue`` more wait
+    in arrival order for ``timeout`` seconds. Only used from the event loop.
+    """
+
+    def __init__(self, limit: int, queue: int, timeout: float):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        """None once admitted (call ``release`` when done), else why not: ``queue_full`` or ``queue_timeout``"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.queue:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=self.timeout)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        if waiter.done():
+            return None
+        self._abandon(waiter)
+        return "queue_timeout"
+
+    def _abandon(self, waiter):
+        if waiter.done():
+            # The slot was handed over just as the wait ended; pass it on
+            self.release()
+        else:
+            waiter.cancel()
+            self._waiters.remove(waiter)
+
+    def release(self):
+        # Hand the slot straight to the longest waiter, so newcomers cannot overtake the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+class AdmissionController:
+    """
+    Applies ``rules`` (``{"METHOD /path": Rule}``) to incoming requests,
+    keeping token buckets in ``buckets`` and timing them with ``clock``.
+    """
+
+    def __init__(self, rules: dict, buckets, clock=time.time):
+        self.rules = rules
+        self.buckets = buckets
+        self.clock = clock
+        self.limits = {route: ConcurrencyLimit(rule.concurrency, rule.queue, rule.queue_timeout) for route, rule in rules.items()}
+
+    def route(self, method: str, path: str):
+        """The rule key matching a request, or None if it is not controlled"""
+        route = f"{method} {path.rstrip('/') or '/'}"
+        return route if route in self.rules else None
+
+    async def _take(self, key: str, rate: tuple) -> float:
+        capacity, per_second = rate
+        if self.buckets.blocking:
+            return await run_in_threadpool(self.buckets.take, key, capacity, per_second, self.clock())
+        return self.buckets.take(key, capacity, per_second, self.clock())
+
+    async def admit(self, route: str, ip: str = None, email: str = None):
+        """None once admitted (call ``release`` when done), else the Rejection to send"""
+        rule = self.rules[route]
+        rejection = None
+        for reason, rate, key in (("ip_rate", rule.ip_rate, ip), ("email_rate", rule.email_rate, email)):
+            if rate and key:
+                retry_after = await self._take(f"{route}:{reason}:{key}", rate)
+                if retry_after:
+                    rejection = Rejection(429, reason, max(1, math.ceil(retry_after)))
+                    break
+        if rejection is None:
+            reason = await self.limits[route].acquire()
+            if reason:
+                rejection = Rejection(503, reason, max(1, math.ceil(rule.queue_timeout)))
+        if rejection:
+            metrics.admission_rejections_total.inc(route, rejection.reason)
+        return rejection
+
+    def release(self, route: str):
+        self.limits[route].release()
+
+    def clear(self):
+        """Forget every bucket; used between tests"""
+        self.buckets.clear()
+
+def request_email(body: bytes):
+    """Lowercased ``email`` of a JSON request body, or None"""
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+def default_rules() -> dict:
+    ip_rate, email_rate = parse_rate(settings.admission_ip_rate), parse_rate(settings.admission_email_rate)
+    queue, timeout = settings.admission_queue, settings.admission_queue_timeout
+    return {
+        "POST /auth/login": Rule(settings.admission_login_concurrency, queue, timeout, ip_rate, email_rate),
+        "POST /auth/signup": Rule(settings.admission_signup_concurrency, queue, timeout, ip_rate, email_rate),
+    }
+
+def make_controller():
+    if not settings.admission_control:
+        return None
+    buckets = RedisBuckets() if settings.admission_backend == "redis" else MemoryBuckets()
+    return AdmissionController(default_rules(), buckets)
+
+controller = make_controller()
+
+def _limit_state(attribute: str):
+    # Reads the module global at scrape time, so a replaced controller is reported
+    return lambda: {(route,): getattr(limit, attribute) for route, limit in controller.limits.items()} if controller else {}
+
+metrics.Callback("admission_queue_depth", "Requests waiting for a concurrency slot", ("route",), _limit_state("waiting"))
+metrics.Callback("admission_active_requests", "Admitted requests being served", ("route",), _limit_state("active"))
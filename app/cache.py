@@ -0,0 +1,207 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+from sqlalchemy import DateTime, Enum as EnumType
+from app.settings import get_settings
+
+# "memory" keeps entries in this process, "redis" shares them (and their
+# invalidation) between workers, "off" disables the list cache.
+settings = get_settings()
+LIST_CACHE_BACKEND = settings.list_cache_backend
+LIST_CACHE_SIZE = settings.list_cache_size
+LIST_CACHE_TTL = settings.list_cache_ttl
+LIST_CACHE_REDIS_URL = settings.list_cache_redis_url
+
+class MemoryBackend:
+    """
+    Bounded in-process LRU of cached values with a TTL.
+
+    Generation counters live apart from the entries and are never evicted,
+    so an entry can never be revived by a counter falling back to an older
+    value.
+    """
+
+    def __init__(self, maxsize: int = LIST_CACHE_SIZE, ttl: int = LIST_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def generations(self, names: list):
+        with self._lock:
+            return [self._generations.get(name, 0) for name in names]
+
+    def bump(self, names: list):
+        with self._lock:
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Cannot cache {type(value).__name__}")
+
+class RedisBackend:
+    """
+    Entries and generation counters in Redis, shared by every worker.
+
+    Entries are JSON with a TTL; counters are plain INCR keys without one,
+    so a ``volatile-*`` maxmemory policy evicts entries but never counters. ``client`` is anything with the
+    redis-py ``get``/``set``/``mget``/``incr`` methods.
+    """
+
+    def __init__(self, client=None, ttl: int = LIST_CACHE_TTL, prefix: str = "listcache:"):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(LIST_CACHE_REDIS_URL)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value):
+        self.client.set(self.prefix + key, json.dumps(value, default=_json_default), ex=self.ttl)
+
+    def generations(self, names: list):
+        return [int(value or 0) for value in self.client.mget([self.prefix + "gen:" + name for name in names])]
+
+    def bump(self, names: list):
+        for name in names:
+            self.client.incr(self.prefix + "gen:" + name)
+
+    def clear(self):
+        pass
+
+def make_backend(name: str = LIST_CACHE_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        return RedisBackend()
+    return None
+
+backend = make_backend()
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+def stats():
+    """Hit and miss counts of the list cache since startup"""
+    with _stats_lock:
+        return {"backend": LIST_CACHE_BACKEND if backend else "off", **_stats}
+
+def _count(outcome: str):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+def clear():
+    if backend:
+        backend.clear()
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+def user_projects(user_id: int) -> str:
+    """Generation scope of a user's project list"""
+    return f"user:{user_id}:projects"
+
+def user_tasks(user_id: int) -> str:
+    """Generation scope of all of a user's tasks"""
+    return f"user:{user_id}:tasks"
+
+def project_tasks(project_id: int) -> str:
+    """Generation scope of one project's tasks"""
+    return f"project:{project_id}:tasks"
+
+def invalidate(*scopes: str):
+    """
+    Bump the generation of each scope, orphaning every cached list built
+    under the previous one. Call after the write has committed.
+    """
+    if backend and scopes:
+        backend.bump(sorted(set(scopes)))
+
+def _dump(model, obj) -> dict:
+    return {column.key: getattr(obj, column.key) for column in model.__table__.columns}
+
+def _restore(column, value):
+    """Undo the JSON round trip of the Redis backend for one column value"""
+    if isinstance(value, str) and isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if value is not None and isinstance(column.type, EnumType) and column.type.enum_class:
+        return column.type.enum_class(value)
+    return value
+
+def _load(model, values: dict):
+    for column in model.__table__.columns:
+        if column.key in values:
+            values[column.key] = _restore(column, values[column.key])
+    # Transient instances: never added to a session, only read by the routes
+    return model(**values)
+
+@lru_cache(maxsize=None)
+def _row_type(keys: tuple):
+    return namedtuple("CachedRow", keys)
+
+def _load_row(columns: tuple, values: list):
+    return _row_type(tuple(column.key for column in columns))(*map(_restore, columns, values))
+
+def read_through(model, namespace: str, user_id: int, scopes: list, params: dict, load, columns: tuple = None):
+    """
+    Return ``load()`` (a list of ``model`` rows), cached under the user,
+    the current generation of every scope and the normalized ``params``.
+
+    Cache hits are returned as detached ``model`` instances. With
+    ``columns``, ``load()`` returns rows of just those columns, and hits are
+    named tuples of them.
+    """
+    if backend is None:
+        return load()
+    if columns:
+        params = {**params, "columns": [column.key for column in columns]}
+    generations = backend.generations(scopes)
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=_json_default).encode()).hexdigest()
+    key = f"{namespace}:{user_id}:{'.'.join(map(str, generations))}:{digest}"
+    cached = backend.get(key)
+    if cached is not None:
+        _count("hits")
+        if columns:
+            return [_load_row(columns, values) for values in cached]
+        return [_load(model, dict(values)) for values in cached]
+    _count("misses")
+    rows = load()
+    backend.set(key, [list(row) if columns else _dump(model, row) for row in rows])
+    return rows
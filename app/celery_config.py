@@ -1,11 +1,20 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import task_postrun, task_prerun
 import os
+import time
+
+# Set before the settings are first read, so workers get their own engine profile
+os.environ.setdefault("DB_PROFILE", "worker")
+
+from app.settings import get_settings
+
+settings = get_settings()
 
 celery = Celery(
     "tasks",
-    broker=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
-    backend=os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    broker=settings.redis_url,
+    backend=settings.redis_url
 )
 
 celery.conf.update(
@@ -22,6 +31,37 @@ celery.conf.beat_schedule = {
         "schedule": crontab(hour=8, minute=0),  # Run daily at 8 AM
     },
 }
+# Only in celery mode, so beat never drains the outbox alongside an in-process dispatcher
+if settings.notification_dispatcher == "celery":
+    celery.conf.beat_schedule["dispatch-notifications"] = {
+        "task": "app.celery_config.dispatch_notifications",
+        "schedule": settings.notification_poll_interval,
+    }
+
+_task_stats = {}
+
+@task_prerun.connect
+def start_task_stats(task_id=None, task=None, **kwargs):
+    from app.database import track_queries
+
+    # Entered here and exited in task_postrun, which runs in the same worker thread
+    tracker = track_queries()
+    _task_stats[task_id] = (tracker, tracker.__enter__(), time.perf_counter())
+
+@task_postrun.connect
+def finish_task_stats(task_id=None, task=None, state=None, **kwargs):
+    from app import metrics
+    from app.database import SQL_DEBUG, warn_repeated
+
+    entry = _task_stats.pop(task_id, None)
+    if entry is None:
+        return
+    tracker, stats, started = entry
+    tracker.__exit__(None, None, None)
+    metrics.celery_task_duration_seconds.observe(time.perf_counter() - started, task.name, state or "UNKNOWN")
+    if SQL_DEBUG:
+        print(f"{task.name}: {stats.count} queries in {stats.duration * 1000:.2f} ms")
+        warn_repeated(stats, task.name)
 
 @celery.task
 def send_task_notification(user_id: int, task_id: int, event: str):
@@ -42,20 +82,23 @@ def send_task_notification(user_id: int, task_id: int, event: str):
 
 @celery.task
 def send_overdue_summary():
-    from app.email_utils import send_email
     from app.database import SessionLocal
-    from app.crud import get_tasks
-    from app import models
-    from datetime import datetime
+    from app.notifications import send_overdue_summaries
 
     db = SessionLocal()
     try:
-        users = db.query(models.User).all()
-        for user in users:
-            tasks = get_tasks(db, user.id, status="pending", due_date=datetime.utcnow())
-            if tasks:
-                subject = "Overdue Tasks Summary"
-                body = "Your overdue tasks:\n" + "\n".join([f"- {task.title} (Due: {task.due_date})" for task in tasks])
-                send_email(user.email, subject, body)
+        return send_overdue_summaries(db)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@celery.task
+def dispatch_notifications():
+    """Drain the notification outbox (used when NOTIFICATION_DISPATCHER=celery)"""
+    from app.database import SessionLocal
+    from app.notifications import drain_outbox
+
+    db = SessionLocal()
+    try:
+        return drain_outbox(db)
+    finally:
+        db.close()
@@ -1,19 +1,19 @@
-from celery import Celery
-from celery.schedules import crontab
-import os
-from dotenv import load_dotenv
+from app.settings import get_settings
 
-# Load environment variables
-load_dotenv()
+settings = get_settings()
 
 # Check if Celery should be enabled
-ENABLE_CELERY = os.getenv("ENABLE_CELERY", "false").lower() == "true"
+ENABLE_CELERY = settings.enable_celery
 
 if ENABLE_CELERY:
+    # Only imported when enabled: the Celery stack is slow to import
+    from celery import Celery
+    from celery.schedules import crontab
+
     celery = Celery(
         "tasks",
-        broker=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
-        backend=os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        broker=settings.redis_url,
+        backend=settings.redis_url
     )
 
     celery.conf.update(
@@ -70,20 +70,11 @@ def send_overdue_summary():
         print("[DISABLED] Overdue summary task")
         return
         
-    from app.email_utils import send_email
     from app.database import SessionLocal
-    from app.crud import get_tasks
-    from app import models
-    from datetime import datetime
+    from app.notifications import send_overdue_summaries
 
     db = SessionLocal()
     try:
-        users = db.query(models.User).all()
-        for user in users:
-            tasks = get_tasks(db, user.id, status="pending", due_date=datetime.utcnow())
-            if tasks:
-                subject = "Overdue Tasks Summary"
-                body = "Your overdue tasks:\n" + "\n".join([f"- {task.title} (Due: {task.due_date})" for task in tasks])
-                send_email(user.email, subject, body)
+        return send_overdue_summaries(db)
     finally:
         db.close()
@@ -1,12 +1,54 @@
+from collections import Counter
+from sqlalchemy import Double, and_, cast, column, delete, exists, func, insert, literal_column, or_, select, table, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from app import models, schemas
-from passlib.context import CryptContext
-from datetime import datetime
+from sqlalchemy.orm.exc import StaleDataError
+from pydantic import BaseModel
+from app import cache, models, reminders, schemas, pagination
+from app.passwords import pwd_context
+from app.settings import get_settings
+from datetime import datetime, timedelta
+import re
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Rows per INSERT/UPDATE batch and ids per IN (...) list in the bulk task operations
+BULK_CHUNK_SIZE = get_settings().bulk_chunk_size
+BULK_MAX_ITEMS = get_settings().bulk_max_items
+# Tasks per DELETE transaction when a project is deleted, and how long a
+# background deletion may go without progress before a new DELETE restarts it
+PROJECT_DELETE_CHUNK_SIZE = get_settings().project_delete_chunk_size
+PROJECT_DELETE_STALE_SECONDS = get_settings().project_delete_stale_seconds
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+# Columns a partial update may not set to NULL
+PROJECT_REQUIRED_FIELDS = ("name",)
+TASK_REQUIRED_FIELDS = ("title", "status", "priority", "project_id")
+
+# Fields of schemas.Project and schemas.Task in response order; a sparse fieldset picks a subset
+PROJECT_FIELDS = ("name", "description", "id", "owner_id", "version")
+TASK_FIELDS = ("title", "description", "status", "priority", "due_date", "project_id", "assigned_user_id", "id", "version")
+PROJECT_DELETION_FIELDS = ("project_id", "status", "total", "deleted", "error", "started_at", "updated_at", "finished_at")
+
+class VersionConflict(Exception):
+    """The row is not at a version the caller accepts (If-Match), or changed while being written"""
+
+def _check_version(row, expected_versions):
+    if expected_versions is not None and row.version not in expected_versions:
+        raise VersionConflict()
+
+def _partial_values(update: BaseModel, required: tuple) -> dict:
+    """Fields set on a partial update schema; raises ValueError for a NULL required field"""
+    values = update.dict(exclude_unset=True)
+    for field in required:
+        if field in values and values[field] is None:
+            raise ValueError(f"{field} may not be null")
+    return values
+
+def field_columns(model, fields: tuple, *required: str) -> tuple:
+    """Columns of ``model`` named by ``fields`` followed by any ``required`` ones not among them"""
+    return tuple(getattr(model, name) for name in dict.fromkeys((*fields, *required)))
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str = None):
+    """Create a user; pass ``hashed_password`` when it was already computed off the request path"""
+    hashed_password = hashed_password or pwd_context.hash(user.password)
     db_user = models.User(
         name=user.name,
         email=user.email, 
@@ -20,72 +62,566 @@ def create_user(db: Session, user: schemas.UserCreate):
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
+def get_user_by_email(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
 def create_project(db: Session, project: schemas.ProjectCreate, user_id: int):
     db_project = models.Project(**project.dict(), owner_id=user_id)
     db.add(db_project)
     db.commit()
+    cache.invalidate(cache.user_projects(user_id))
     db.refresh(db_project)
     return db_project
 
-def get_projects(db: Session, user_id: int):
-    return db.query(models.Project).filter(models.Project.owner_id == user_id).all()
+def get_projects(db: Session, user_id: int, fields: tuple = None):
+    """
+    The user's projects, read through the list cache. With ``fields``
+    (names from PROJECT_FIELDS) they are plain rows of those columns plus
+    id and version, never loaded into the session.
+    """
+    columns = field_columns(models.Project, fields, "id", "version") if fields else None
+    query = db.query(*(columns or (models.Project,))).filter(models.Project.owner_id == user_id).order_by(models.Project.id)
+    return cache.read_through(models.Project, "projects", user_id, [cache.user_projects(user_id)], {}, query.all, columns)
+
+def get_project_versions(db: Session, user_id: int):
+    """(id, version) of the user's projects in GET /projects order"""
+    return db.query(models.Project.id, models.Project.version).filter(models.Project.owner_id == user_id).order_by(models.Project.id).all()
 
 def get_project(db: Session, project_id: int, user_id: int):
     return db.query(models.Project).filter(models.Project.id == project_id, models.Project.owner_id == user_id).first()
 
-def update_project(db: Session, project_id: int, project: schemas.ProjectCreate, user_id: int):
-    db_project = get_project(db, project_id, user_id)
-    if db_project:
-        for key, value in project.dict().items():
-            setattr(db_project, key, value)
-        db.commit()
-        db.refresh(db_project)
-    return db_project
+def get_project_version(db: Session, project_id: int, user_id: int):
+    return db.query(models.Project.version).filter(models.Project.id == project_id, models.Project.owner_id == user_id).scalar()
+
+def update_project(db: Session, project_id: int, project: schemas.ProjectUpdate, user_id: int, expected_versions: list = None):
+    """
+    Write the fields set on ``project`` with a single UPDATE ... RETURNING
+    and return the updated row, or None if the user has no such project.
+
+    Raises VersionConflict unless the project is at one of
+    ``expected_versions`` (any, if None).
+    """
+    values = _partial_values(project, PROJECT_REQUIRED_FIELDS)
+    if not values:
+        db_project = get_project(db, project_id, user_id)
+        if db_project:
+            _check_version(db_project, expected_versions)
+        return db_project
+    projects = models.Project.__table__
+    conditions = [projects.c.id == project_id, projects.c.owner_id == user_id]
+    if expected_versions is not None:
+        conditions.append(projects.c.version.in_(expected_versions))
+    row = db.execute(update(projects).where(*conditions).values(**values, version=projects.c.version + 1).returning(*projects.c)).first()
+    if row is None:
+        if expected_versions is not None and get_project_version(db, project_id, user_id) is not None:
+            raise VersionConflict()
+        return None
+    db.commit()
+    cache.invalidate(cache.user_projects(user_id))
+    return row
 
-def delete_project(db: Session, project_id: int, user_id: int):
+def count_project_tasks(db: Session, project_id: int) -> int:
+    """Number of tasks in a project, from its project_task_stats counters"""
+    return db.query(func.coalesce(func.sum(models.ProjectTaskStats.count), 0)).filter(models.ProjectTaskStats.project_id == project_id).scalar()
+
+def _record_deletion(db: Session, project_id: int, **values):
+    """Update the project's background deletion record, if it has one, in the caller's transaction"""
+    deletions = models.ProjectDeletion.__table__
+    db.execute(update(deletions).where(deletions.c.project_id == project_id).values(**values, updated_at=datetime.utcnow()))
+
+def delete_project(db: Session, project_id: int, user_id: int, chunk_size: int = None):
+    """
+    Delete the user's project with all of its tasks and return it (detached),
+    or None if the user has no such project.
+
+    Tasks are removed set-based, with DELETE ... WHERE id IN (the next
+    ``chunk_size`` ids of the project) ... RETURNING status, committing after
+    every chunk so no lock is held for long. Each chunk also decrements the
+    status counters and advances the project's deletion record. Tasks added
+    meanwhile go in the final transaction with the counters and the project
+    itself; the ON DELETE CASCADE foreign keys cover any other writer.
+    """
+    chunk_size = chunk_size or PROJECT_DELETE_CHUNK_SIZE
     db_project = get_project(db, project_id, user_id)
-    if db_project:
-        db.delete(db_project)
+    if not db_project:
+        return None
+    db.expunge(db_project)
+    tasks = models.Task.__table__
+    deleted = 0
+    while True:
+        chunk = select(tasks.c.id).where(tasks.c.project_id == project_id).limit(chunk_size)
+        rows = db.execute(delete(tasks).where(tasks.c.id.in_(chunk.scalar_subquery())).returning(tasks.c.id, tasks.c.status)).all()
+        if not rows:
+            break
+        deleted += len(rows)
+        bump_task_stats(db, {(project_id, status): -count for status, count in Counter(row.status for row in rows).items()})
+        _record_deletion(db, project_id, deleted=deleted)
         db.commit()
+        _invalidate_tasks(user_id, [project_id])
+        reminders.tasks_removed([row.id for row in rows])
+        if len(rows) < chunk_size:
+            break
+
+    deleted += db.execute(delete(tasks).where(tasks.c.project_id == project_id)).rowcount
+    db.execute(delete(models.ProjectTaskStats).where(models.ProjectTaskStats.project_id == project_id))
+    db.execute(delete(models.Project).where(models.Project.id == project_id))
+    _record_deletion(db, project_id, deleted=deleted, status="completed", finished_at=datetime.utcnow())
+    db.commit()
+    cache.invalidate(cache.user_projects(user_id), cache.user_tasks(user_id), cache.project_tasks(project_id))
     return db_project
 
+def start_project_deletion(db: Session, project_id: int, user_id: int, stale_after: int = PROJECT_DELETE_STALE_SECONDS):
+    """
+    Create or restart the deletion record of a project about to be deleted
+    in the background. Returns ``(record, started)``; ``started`` is False
+    when a deletion of the project is already running and has made progress
+    within ``stale_after`` seconds, so no second one should be started.
+
+    The record is claimed with INSERT ... ON CONFLICT DO NOTHING, or for an
+    existing one an UPDATE guarded by its status and progress, so of two
+    concurrent requests only one starts the deletion.
+    """
+    now = datetime.utcnow()
+    deletions = models.ProjectDeletion.__table__
+    values = {
+        "owner_id": user_id, "status": "running", "total": count_project_tasks(db, project_id), "deleted": 0,
+        "error": None, "started_at": now, "updated_at": now, "finished_at": None,
+    }
+    statement = _dialect_insert(db, models.ProjectDeletion)
+    if statement is not None:
+        started = db.execute(statement.values(project_id=project_id, **values).on_conflict_do_nothing()).rowcount > 0
+    else:
+        started = db.get(models.ProjectDeletion, project_id) is None
+        if started:
+            db.execute(insert(deletions).values(project_id=project_id, **values))
+    if not started:
+        restartable = or_(deletions.c.status != "running", deletions.c.updated_at <= now - timedelta(seconds=stale_after))
+        started = db.execute(update(deletions).where(deletions.c.project_id == project_id, restartable).values(**values)).rowcount > 0
+    db.commit()
+    return db.get(models.ProjectDeletion, project_id), started
+
+def fail_project_deletion(db: Session, project_id: int, error: str):
+    _record_deletion(db, project_id, status="failed", error=error, finished_at=datetime.utcnow())
+    db.commit()
+
+def get_project_deletion(db: Session, project_id: int, user_id: int):
+    return db.query(models.ProjectDeletion).filter(models.ProjectDeletion.project_id == project_id, models.ProjectDeletion.owner_id == user_id).first()
+
+def _invalidate_tasks(user_id: int, project_ids):
+    """Orphan cached task lists of the user and of each project; call after commit"""
+    cache.invalidate(cache.user_tasks(user_id), *(cache.project_tasks(project_id) for project_id in project_ids))
+
+def enqueue_notification(db: Session, user_id: int, task_id: int, event: str):
+    """Queue a notification in the caller's transaction; the dispatcher delivers it after commit"""
+    db.add(models.NotificationOutbox(user_id=user_id, task_id=task_id, event=event))
+
 def create_task(db: Session, task: schemas.TaskCreate, user_id: int):
        db_task = models.Task(**task.dict())
        db.add(db_task)
+       if db_task.assigned_user_id:
+           db.flush()
+           enqueue_notification(db, db_task.assigned_user_id, db_task.id, "assigned")
+       bump_task_stats(db, {(db_task.project_id, db_task.status): 1})
        db.commit()
+       _invalidate_tasks(user_id, [db_task.project_id])
        db.refresh(db_task)
+       reminders.task_changed(db_task.id, db_task.due_date, db_task.status)
        return db_task
 
-def get_tasks(db: Session, user_id: int, status: str = None, priority: int = None, due_date: datetime = None, project_id: int = None, sort_by: str = None, order: str = "asc", page: int = 1, per_page: int = 10):
-    query = db.query(models.Task).join(models.Project).filter(models.Project.owner_id == user_id)
+def task_filters(user_id: int, status: str = None, priority: int = None, due_date: datetime = None, project_id: int = None):
+    """WHERE clauses for the GET /tasks filters; the query must join tasks to projects"""
+    clauses = [models.Project.owner_id == user_id]
     if status:
-        query = query.filter(models.Task.status == status)
+        clauses.append(models.Task.status == status)
     if priority:
-        query = query.filter(models.Task.priority == priority)
+        clauses.append(models.Task.priority == priority)
     if due_date:
-        query = query.filter(models.Task.due_date <= due_date)
+        clauses.append(models.Task.due_date <= due_date)
     if project_id:
-           query = query.filter(models.Task.project_id == project_id)
-    if sort_by:
-        order_col = getattr(models.Task, sort_by)
-        query = query.order_by(order_col.asc() if order == "asc" else order_col.desc())
-    return query.offset((page - 1) * per_page).limit(per_page).all()
+        clauses.append(models.Task.project_id == project_id)
+    return clauses
 
-def get_task(db: Session, task_id: int, user_id: int):
-    return db.query(models.Task).join(models.Project).filter(models.Task.id == task_id, models.Project.owner_id == user_id).first()
+def filter_tasks(db: Session, user_id: int, status: str = None, priority: int = None, due_date: datetime = None, project_id: int = None, columns: tuple = None):
+    """Query of the user's tasks (or just ``columns`` of them) matching the GET /tasks filters, without ordering"""
+    return db.query(*(columns or (models.Task,))).select_from(models.Task).join(models.Project).filter(*task_filters(user_id, status, priority, due_date, project_id))
 
-def update_task(db: Session, task_id: int, task: schemas.TaskCreate, user_id: int):
-    db_task = get_task(db, task_id, user_id)
-    if db_task:
-        for key, value in task.dict().items():
-            setattr(db_task, key, value)
-        db.commit()
-        db.refresh(db_task)
-    return db_task
+def get_tasks(db: Session, user_id: int, status: str = None, priority: int = None, due_date: datetime = None, project_id: int = None, sort_by: str = None, order: str = "asc", page: int = 1, per_page: int = 10, cursor: str = None, columns: tuple = None, fields: tuple = None):
+    """
+    List the user's tasks, or just ``columns`` of them bypassing the list
+    cache. With ``fields`` (names from TASK_FIELDS) they are cached plain
+    rows of those columns plus the id, version and sort column the page's
+    ETag and cursor need.
+
+    Rows are always ordered by the whitelisted ``sort_by`` column with ``id``
+    as tie-breaker. With ``cursor`` (see ``pagination.encode_cursor``) the
+    page starts right after the cursor row instead of at an offset, so deep
+    pages cost the same as the first one. Raises ValueError for an unknown
+    sort column or order and ``pagination.InvalidCursor`` for a bad cursor.
+    """
+    if order not in pagination.SORT_ORDERS:
+        raise ValueError("order must be 'asc' or 'desc'")
+    sort_by, order_col = pagination.sort_column(sort_by)
+    selected = columns or (field_columns(models.Task, fields, "id", "version", sort_by) if fields else None)
+    query = filter_tasks(db, user_id, status, priority, due_date, project_id, selected)
+    query = query.order_by(*pagination.order_by_clauses(order_col, order))
+    if cursor:
+        value, last_id = pagination.decode_cursor(cursor, sort_by, order)
+        query = query.filter(pagination.after_cursor(order_col, order, value, last_id)).limit(per_page)
+    else:
+        query = query.offset((page - 1) * per_page).limit(per_page)
+    if columns:
+        return query.all()
+    # A project filter only depends on that project's tasks, so writes elsewhere keep the entry
+    scope = cache.project_tasks(project_id) if project_id else cache.user_tasks(user_id)
+    params = {
+        "status": status, "priority": priority, "due_date": due_date, "project_id": project_id,
+        "sort_by": sort_by, "order": order, "per_page": per_page,
+        "page": None if cursor else page, "cursor": cursor,
+    }
+    return cache.read_through(models.Task, "tasks", user_id, [scope], params, query.all, selected)
+
+def get_task_versions(db: Session, user_id: int, status: str = None, priority: int = None, due_date: datetime = None, project_id: int = None, sort_by: str = None, order: str = "asc", page: int = 1, per_page: int = 10, cursor: str = None):
+    """
+    The page ``get_tasks`` would return with the same arguments, as (id,
+    version, sort column) rows: enough for its ETag and next cursor.
+    """
+    _, order_col = pagination.sort_column(sort_by)
+    columns = (models.Task.id, models.Task.version) if order_col is models.Task.id else (models.Task.id, models.Task.version, order_col)
+    return get_tasks(db, user_id, status, priority, due_date, project_id, sort_by, order, page, per_page, cursor, columns)
+
+def search_terms(q: str) -> str:
+    """Normalized search query: its words, lowercased, without any query syntax"""
+    return " ".join(re.findall(r"\w+", q.lower()))
+
+def search_tasks(db: Session, user_id: int, q: str, project_id: int = None, per_page: int = 10, cursor: str = None):
+    """
+    Full-text search over the user's task titles and descriptions.
+
+    Matches tasks containing every word of ``q`` through the tasks_fts FTS5
+    table on SQLite or the ix_tasks_search GIN index on Postgres. Returns
+    (task, rank) rows, best match first with ``id`` as tie-breaker; pass
+    ``pagination.encode_search_cursor`` of the last row as ``cursor`` for the
+    next page. Raises ``pagination.InvalidCursor`` for a bad cursor.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+    if db.get_bind().dialect.name == "sqlite":
+        fts = table("tasks_fts", column("rowid"))
+        # bm25() is lower for better matches; negate it so both backends sort rank descending
+        rank = -func.bm25(literal_column("tasks_fts"))
+        match = " ".join(f'"{term}"' for term in terms.split())
+        query = db.query(models.Task, rank).join(fts, fts.c.rowid == models.Task.id).filter(literal_column("tasks_fts").op("MATCH")(match))
+    else:
+        vector = models.task_search_vector(models.Task.title, models.Task.description)
+        tsquery = func.plainto_tsquery(literal_column("'english'::regconfig"), terms)
+        # ts_rank() is a real; as a double it round-trips exactly through the cursor
+        rank = cast(func.ts_rank(vector, tsquery), Double)
+        query = db.query(models.Task, rank).filter(vector.op("@@")(tsquery))
+    query = query.join(models.Project, models.Task.project_id == models.Project.id).filter(*task_filters(user_id, project_id=project_id))
+    if cursor:
+        last_rank, last_id = pagination.decode_search_cursor(cursor, terms)
+        query = query.filter(or_(rank < last_rank, and_(rank == last_rank, models.Task.id > last_id)))
+    return query.order_by(rank.desc(), models.Task.id).limit(per_page).all()
+
+def get_task(db: Session, task_id: int, user_id: int, fields: tuple = None):
+    """The user's task, or with ``fields`` a plain row of those columns and its version"""
+    columns = field_columns(models.Task, fields, "version") if fields else (models.Task,)
+    return db.query(*columns).select_from(models.Task).join(models.Project).filter(models.Task.id == task_id, models.Project.owner_id == user_id).first()
+
+def get_task_version(db: Session, task_id: int, user_id: int):
+    return db.query(models.Task.version).join(models.Project).filter(models.Task.id == task_id, models.Project.owner_id == user_id).scalar()
+
+def update_task(db: Session, task_id: int, task: schemas.TaskUpdate, user_id: int, expected_versions: list = None):
+    """
+    Write the fields set on ``task`` and return the updated row, or None if
+    the user owns no such task (or does not own the project it moves to).
+
+    On Postgres this is a single UPDATE ... FROM (old row) ... RETURNING
+    that also yields the previous status, project and assignee for the
+    stats and notifications. SQLite's RETURNING cannot read other tables, so
+    there the old row is read first and the UPDATE is guarded by its
+    version. Raises VersionConflict unless the task is at one of
+    ``expected_versions`` (any, if None), or if it changed in between.
+    """
+    values = _partial_values(task, TASK_REQUIRED_FIELDS)
+    if not values:
+        db_task = get_task(db, task_id, user_id)
+        if db_task:
+            _check_version(db_task, expected_versions)
+        return db_task
+    tasks = models.Task.__table__
+    owned_projects = select(models.Project.id).where(models.Project.owner_id == user_id)
+    conditions = [tasks.c.project_id.in_(owned_projects)]
+    if "project_id" in values:
+        conditions.append(exists().where(models.Project.id == values["project_id"], models.Project.owner_id == user_id))
+    if expected_versions is not None:
+        conditions.append(tasks.c.version.in_(expected_versions))
+    statement = update(tasks).values(**values, version=tasks.c.version + 1)
+
+    if db.get_bind().dialect.name == "postgresql":
+        old = select(tasks.c.id, tasks.c.status, tasks.c.project_id, tasks.c.assigned_user_id).where(tasks.c.id == task_id).with_for_update().subquery("old")
+        row = db.execute(statement.where(tasks.c.id == old.c.id, *conditions).returning(
+            *tasks.c, old.c.status.label("old_status"), old.c.project_id.label("old_project_id"), old.c.assigned_user_id.label("old_assigned_user_id"),
+        )).first()
+        loaded_version = None
+        if row is not None:
+            old_status, old_project_id, old_assigned_user_id = row.old_status, row.old_project_id, row.old_assigned_user_id
+    else:
+        old = db.execute(select(tasks.c.version, tasks.c.status, tasks.c.project_id, tasks.c.assigned_user_id).where(tasks.c.id == task_id)).first()
+        if old is None:
+            return None
+        row = db.execute(statement.where(tasks.c.id == task_id, tasks.c.version == old.version, *conditions).returning(*tasks.c)).first()
+        loaded_version = old.version
+        old_status, old_project_id, old_assigned_user_id = old.status, old.project_id, old.assigned_user_id
+    if row is None:
+        # Nothing matched: tell a version mismatch or lost race apart from a task (or target project) the user does not own
+        version = get_task_version(db, task_id, user_id)
+        if version is not None and ((expected_versions is not None and version not in expected_versions) or loaded_version not in (None, version)):
+            raise VersionConflict()
+        return None
+
+    if row.assigned_user_id and row.assigned_user_id != old_assigned_user_id:
+        enqueue_notification(db, row.assigned_user_id, task_id, "assigned")
+    if row.assigned_user_id and row.status != old_status:
+        enqueue_notification(db, row.assigned_user_id, task_id, "status_changed")
+    deltas = Counter()
+    deltas[(old_project_id, old_status)] -= 1
+    deltas[(row.project_id, row.status)] += 1
+    bump_task_stats(db, deltas)
+    db.commit()
+    _invalidate_tasks(user_id, [old_project_id, row.project_id])
+    reminders.task_changed(task_id, row.due_date, row.status)
+    return row
 
 def delete_task(db: Session, task_id: int, user_id: int):
     db_task = get_task(db, task_id, user_id)
     if db_task:
+        project_id = db_task.project_id
+        bump_task_stats(db, {(project_id, db_task.status): -1})
         db.delete(db_task)
         db.commit()
-    return db_task
\ No newline at end of file
+        _invalidate_tasks(user_id, [project_id])
+        reminders.tasks_removed([task_id])
+    return db_task
+
+def _chunks(items: list, size: int = None):
+    size = size or BULK_CHUNK_SIZE
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _owned_project_ids(db: Session, project_ids, user_id: int):
+    owned = set()
+    for chunk in _chunks(sorted(set(project_ids))):
+        owned.update(row.id for row in db.query(models.Project.id).filter(models.Project.id.in_(chunk), models.Project.owner_id == user_id))
+    return owned
+
+def _owned_tasks(db: Session, task_ids, user_id: int):
+    """(id, project_id, status, assigned_user_id, version) rows of the given tasks the user owns, keyed by id"""
+    tasks = {}
+    query = db.query(models.Task.id, models.Task.project_id, models.Task.status, models.Task.assigned_user_id, models.Task.version).join(models.Project)
+    for chunk in _chunks(sorted(set(task_ids))):
+        for row in query.filter(models.Task.id.in_(chunk), models.Project.owner_id == user_id):
+            tasks[row.id] = row
+    return tasks
+
+def _enqueue_notifications(db: Session, notifications: list):
+    for chunk in _chunks(notifications):
+        db.execute(insert(models.NotificationOutbox), chunk)
+
+def bulk_create_tasks(db: Session, tasks: list, user_id: int):
+    """
+    Create many tasks in one transaction and return per-item results.
+
+    Project ownership is checked once per distinct project; rows are written
+    with chunked multi-row INSERT ... RETURNING, and assignment
+    notifications are queued in one batch.
+    """
+    owned = _owned_project_ids(db, [task.project_id for task in tasks], user_id)
+    results = [None] * len(tasks)
+    pending = []
+    for index, task in enumerate(tasks):
+        if task.project_id in owned:
+            pending.append((index, task.dict()))
+        else:
+            results[index] = {"index": index, "status": 404, "detail": "Project not found"}
+
+    notifications = []
+    statement = insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True)
+    for chunk in _chunks(pending):
+        task_ids = db.scalars(statement, [row for _, row in chunk]).all()
+        for (index, row), task_id in zip(chunk, task_ids):
+            results[index] = {"index": index, "status": 201, "id": task_id, "task": {**row, "id": task_id, "version": 1}}
+            if row["assigned_user_id"]:
+                notifications.append({"user_id": row["assigned_user_id"], "task_id": task_id, "event": "assigned"})
+    deltas = Counter((row["project_id"], row["status"]) for _, row in pending)
+    bump_task_stats(db, deltas)
+    _enqueue_notifications(db, notifications)
+    db.commit()
+    _invalidate_tasks(user_id, [project_id for project_id, _ in deltas])
+    for result in results:
+        if result["status"] in (200, 201):
+            reminders.task_changed(result["id"], result["task"]["due_date"], result["task"]["status"])
+    return results
+
+def bulk_update_tasks(db: Session, items: list, user_id: int):
+    """
+    Replace many tasks in one transaction and return per-item results.
+
+    Targets and new projects are each checked with one query per chunk of
+    ids, and the changes are written with a chunked executemany UPDATE.
+    Only the first item for an id is applied; repeats get a 400 result.
+    """
+    existing = _owned_tasks(db, [item.id for item in items], user_id)
+    owned = _owned_project_ids(db, [item.project_id for item in items], user_id)
+    results = [None] * len(items)
+    rows = []
+    notifications = []
+    deltas = Counter()
+    seen = set()
+    for index, item in enumerate(items):
+        if item.id in seen:
+            # A repeat would match the version the first write already bumped
+            results[index] = {"index": index, "status": 400, "id": item.id, "detail": "Duplicate id"}
+            continue
+        seen.add(item.id)
+        current = existing.get(item.id)
+        if current is None:
+            results[index] = {"index": index, "status": 404, "id": item.id, "detail": "Task not found"}
+            continue
+        if item.project_id not in owned:
+            results[index] = {"index": index, "status": 404, "id": item.id, "detail": "Project not found"}
+            continue
+        values = item.dict()
+        if values["assigned_user_id"] and values["assigned_user_id"] != current.assigned_user_id:
+            notifications.append({"user_id": values["assigned_user_id"], "task_id": item.id, "event": "assigned"})
+        if values["assigned_user_id"] and values["status"] != current.status:
+            notifications.append({"user_id": values["assigned_user_id"], "task_id": item.id, "event": "status_changed"})
+        deltas[(current.project_id, current.status)] -= 1
+        deltas[(values["project_id"], values["status"])] += 1
+        # The loaded version goes in the WHERE clause; the ORM writes version + 1
+        rows.append({**values, "version": current.version})
+        results[index] = {"index": index, "status": 200, "id": item.id, "task": {**values, "version": current.version + 1}}
+
+    try:
+        for chunk in _chunks(rows):
+            db.execute(update(models.Task), chunk)
+    except StaleDataError:
+        db.rollback()
+        raise VersionConflict()
+    bump_task_stats(db, deltas)
+    _enqueue_notifications(db, notifications)
+    db.commit()
+    _invalidate_tasks(user_id, [project_id for project_id, _ in deltas])
+    for result in results:
+        if result["status"] in (200, 201):
+            reminders.task_changed(result["id"], result["task"]["due_date"], result["task"]["status"])
+    return results
+
+def bulk_delete_tasks(db: Session, task_ids: list, user_id: int):
+    """Delete many tasks in one transaction and return per-item results"""
+    existing = _owned_tasks(db, task_ids, user_id)
+    for chunk in _chunks(sorted(existing)):
+        db.execute(delete(models.Task).where(models.Task.id.in_(chunk)), execution_options={"synchronize_session": False})
+    deltas = Counter()
+    for row in existing.values():
+        deltas[(row.project_id, row.status)] -= 1
+    bump_task_stats(db, deltas)
+    db.commit()
+    _invalidate_tasks(user_id, [project_id for project_id, _ in deltas])
+    reminders.tasks_removed(existing)
+    return [
+        {"index": index, "status": 204, "id": task_id} if task_id in existing
+        else {"index": index, "status": 404, "id": task_id, "detail": "Task not found"}
+        for index, task_id in enumerate(task_ids)
+    ]
+
+def _dialect_insert(db: Session, model):
+    """An INSERT with ON CONFLICT support for ``model``, or None if the database has none"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    return None
+
+def bump_task_stats(db: Session, deltas: dict):
+    """
+    Apply ``{(project_id, status): delta}`` to project_task_stats in the caller's transaction.
+
+    Uses INSERT ... ON CONFLICT DO UPDATE where the database supports it, so
+    concurrent writers never race on creating a row.
+    """
+    rows = [
+        {"project_id": project_id, "status": models.TaskStatus(status), "count": delta}
+        for (project_id, status), delta in deltas.items()
+        if delta and project_id is not None and status is not None
+    ]
+    if not rows:
+        return
+    statement = _dialect_insert(db, models.ProjectTaskStats)
+    if statement is not None:
+        statement = statement.on_conflict_do_update(
+            index_elements=["project_id", "status"],
+            set_={"count": models.ProjectTaskStats.count + statement.excluded.count},
+        )
+        for row in rows:
+            db.execute(statement.values(**row))
+        return
+    for row in rows:
+        updated = db.execute(
+            update(models.ProjectTaskStats)
+            .where(models.ProjectTaskStats.project_id == row["project_id"], models.ProjectTaskStats.status == row["status"])
+            .values(count=models.ProjectTaskStats.count + row["count"])
+        )
+        if not updated.rowcount:
+            db.execute(insert(models.ProjectTaskStats).values(**row))
+
+def get_project_stats(db: Session, user_id: int, project_id: int = None, now: datetime = None):
+    """
+    Task counts by status plus overdue count for the user's projects.
+
+    Status counts come from project_task_stats (a few rows per project).
+    Overdue is time-dependent, so it is counted live, but only over the
+    overdue range of ix_tasks_project_status_due_date.
+    """
+    now = now or datetime.utcnow()
+    projects = db.query(models.Project.id).filter(models.Project.owner_id == user_id)
+    if project_id is not None:
+        projects = projects.filter(models.Project.id == project_id)
+    stats = {row.id: {"project_id": row.id, "total": 0, "overdue": 0, "by_status": {status.value: 0 for status in models.TaskStatus}} for row in projects}
+    if not stats:
+        return []
+
+    counts = db.query(models.ProjectTaskStats).filter(models.ProjectTaskStats.project_id.in_(stats))
+    for row in counts:
+        stats[row.project_id]["by_status"][models.TaskStatus(row.status).value] = row.count
+        stats[row.project_id]["total"] += row.count
+
+    overdue = (
+        db.query(models.Task.project_id, func.count())
+        .filter(
+            models.Task.project_id.in_(stats),
+            models.Task.status.in_([models.TaskStatus.pending, models.TaskStatus.in_progress]),
+            models.Task.due_date < now,
+        )
+        .group_by(models.Task.project_id)
+    )
+    for project, count in overdue:
+        stats[project]["overdue"] = count
+    return list(stats.values())
+
+def rebuild_project_task_stats(db: Session):
+    """Recompute project_task_stats from tasks, fixing any drift; returns the number of rows written"""
+    db.execute(delete(models.ProjectTaskStats))
+    counts = (
+        db.query(models.Task.project_id, models.Task.status, func.count())
+        .filter(models.Task.project_id.isnot(None), models.Task.status.isnot(None))
+        .group_by(models.Task.project_id, models.Task.status)
+        .all()
+    )
+    rows = [{"project_id": project_id, "status": status, "count": count} for project_id, status, count in counts]
+    for chunk in _chunks(rows):
+        db.execute(insert(models.ProjectTaskStats), chunk)
+    db.commit()
+    return len(rows)
@@ -0,0 +1,25 @@
+"""
+Background deletion of large projects.
+
+DELETE /projects/{id} removes projects of up to PROJECT_DELETE_SYNC_LIMIT
+tasks within the request. Larger ones answer 202 and are deleted here,
+after the response, with a session of their own; the chunked delete keeps
+the project's project_deletions row current for GET /projects/{id}/deletion.
+"""
+from app import crud
+from app.database import SessionLocal
+from app.settings import get_settings
+
+PROJECT_DELETE_SYNC_LIMIT = get_settings().project_delete_sync_limit
+
+def run_project_deletion(project_id: int, user_id: int, chunk_size: int = None):
+    db = SessionLocal()
+    try:
+        if crud.delete_project(db, project_id, user_id, chunk_size) is None:
+            crud.fail_project_deletion(db, project_id, "Project not found")
+    except Exception as e:
+        db.rollback()
+        crud.fail_project_deletion(db, project_id, str(e))
+        print(f"❌ Deleting project {project_id} failed: {e}")
+    finally:
+        db.close()
@@ -1,32 +1,133 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from app import models, schemas
-from app.database import get_db
-from dotenv import load_dotenv
-import os
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+from app import crud, models
+from app.database import get_session, run_db
+from collections import OrderedDict
+from app.settings import get_settings
+from typing import NamedTuple
+import hashlib
+import threading
+import time
 
-# Load environment variables from .env file
-load_dotenv()
+settings = get_settings()
 
 # Set default secret key for development
-SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production-12345678901234567890")
+SECRET_KEY = settings.secret_key
 ALGORITHM = "HS256"
+AUTH_CACHE_SIZE = settings.auth_cache_size
 
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    """Get current user from Bearer token"""
+class Principal(NamedTuple):
+    """The authenticated caller, built from verified token claims"""
+    id: int
+
+def password_fingerprint(user: models.User) -> str:
+    """Embedded in tokens so a password change revokes them; a login rehash of the same password leaves it alone"""
+    return str(user.password_version)
+
+class TokenCache:
+    """
+    Bounded LRU of verified tokens keyed by token digest.
+
+    Entries expire at the token's ``exp`` and can be dropped per user. A
+    ``maxsize`` of 0 disables caching.
+    """
+
+    def __init__(self, maxsize: int = AUTH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        if not self.maxsize:
+            return None
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if time.time() >= expires_at:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, token: str, principal: Principal, expires_at: float):
+        if not self.maxsize:
+            return
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (principal, expires_at)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in self._by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, key: str):
+        principal, _ = self._entries.pop(key)
+        keys = self._by_user.get(principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[principal.id]
+
+    def __len__(self):
+        return len(self._entries)
+
+token_cache = TokenCache()
+
+@event.listens_for(models.User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    token_cache.invalidate_user(target.id)
+
+@event.listens_for(models.User, "after_update")
+def _invalidate_changed_password(mapper, connection, target):
+    if get_history(target, "hashed_password").has_changes():
+        token_cache.invalidate_user(target.id)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db=Depends(get_session)):
+    """
+    Get the caller from a Bearer token.
+
+    A token seen before is answered from ``token_cache`` without touching the
+    database. On a miss the user row is checked once (it must still exist and
+    its password must not have changed since the token was issued).
+    """
+    token = credentials.credentials
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: int = int(payload.get("sub"))
-        if user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if user is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-        return user
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
\ No newline at end of file
+    except (JWTError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    user = await run_db(db, crud.get_user, user_id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    if "pwd" in payload and payload["pwd"] != password_fingerprint(user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    principal = Principal(id=user.id)
+    if "exp" in payload:
+        token_cache.put(token, principal, payload["exp"])
+    return principal
@@ -1,68 +1,203 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import os
-from dotenv import load_dotenv
+# smtplib and email.mime are imported where they are used: most processes never send mail
+import threading
+import time
+from collections import deque
+from app import metrics
+from app.settings import get_settings
 
-# Load environment variables
-load_dotenv()
+settings = get_settings()
 
-def send_email(to_email: str, subject: str, body: str):
+SMTP_POOL_SIZE = settings.smtp_pool_size
+SMTP_TIMEOUT = settings.smtp_timeout
+SMTP_MAX_IDLE = settings.smtp_max_idle
+
+class SMTPPool:
+    """
+    Pool of authenticated SMTP sessions.
+
+    At most ``max_size`` sessions are open at once; callers beyond that wait
+    for a free slot. Idle sessions are kept for reuse and probed with NOOP
+    when they have been idle longer than ``max_idle`` seconds. A session that
+    drops mid-batch is replaced once and the failed message is retried.
+    """
+
+    def __init__(self, host: str, port: int, user: str, password: str, use_tls: bool = True,
+                 max_size: int = SMTP_POOL_SIZE, timeout: float = SMTP_TIMEOUT, max_idle: float = SMTP_MAX_IDLE):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        import smtplib
+
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            server.login(self.user, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        return server
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.max_idle:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except Exception:
+                pass
+            self._close(server)
+        return self._connect()
+
+    def _checkin(self, server):
+        with self._lock:
+            self._idle.append((server, time.monotonic()))
+
+    def send_many(self, messages):
+        """
+        Send ``(to_email, message)`` pairs over one pooled session.
+
+        Returns a list of booleans in the same order as ``messages``.
+        """
+        import smtplib
+
+        results = []
+        server = None
+        with self._slots:
+            try:
+                server = self._checkout()
+                for to_email, msg in messages:
+                    started = time.perf_counter()
+                    try:
+                        try:
+                            server.sendmail(self.user, to_email, msg.as_string())
+                        except (smtplib.SMTPServerDisconnected, OSError):
+                            self._close(server)
+                            server = None
+                            server = self._connect()
+                            server.sendmail(self.user, to_email, msg.as_string())
+                        metrics.smtp_send_seconds.observe(time.perf_counter() - started)
+                        results.append(True)
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                        print(f"❌ Error sending email to {to_email}: {e}")
+                        metrics.smtp_send_failures_total.inc("rejected")
+                        results.append(False)
+            except Exception as e:
+                print(f"❌ SMTP session failed: {e}")
+                metrics.smtp_send_failures_total.inc("session", amount=len(messages) - len(results))
+                results.extend([False] * (len(messages) - len(results)))
+                if server is not None:
+                    self._close(server)
+                    server = None
+            finally:
+                if server is not None:
+                    self._checkin(server)
+        return results
+
+    def close(self):
+        """Log out of every idle session"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for server, _ in idle:
+            self._close(server)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_smtp_pool():
+    """Return the process-wide SMTP pool, or None when SMTP is not configured"""
+    global _pool
+    if not settings.smtp_user or not settings.smtp_password:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool(
+                host=settings.smtp_host,
+                port=settings.smtp_port,
+                user=settings.smtp_user,
+                password=settings.smtp_password,
+                use_tls=settings.smtp_use_tls,
+            )
+        return _pool
+
+def close_smtp_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+def build_message(from_email: str, to_email: str, subject: str, body: str):
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    msg = MIMEMultipart()
+    msg["Subject"] = subject
+    msg["From"] = from_email
+    msg["To"] = to_email
+    msg.attach(MIMEText(body, "plain"))
+    return msg
+
+def send_many(emails):
     """
-    Send email using Gmail SMTP
+    Send many ``(to_email, subject, body)`` emails over pooled SMTP sessions.
+
+    Returns a list of booleans in the same order as ``emails``.
     """
-    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    smtp_use_tls = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
-    
-    if not smtp_user or not smtp_password:
+    emails = list(emails)
+    pool = get_smtp_pool()
+    if pool is None:
         print("❌ Email configuration missing. Please set SMTP_USER and SMTP_PASSWORD in .env file")
-        return False
-    
-    try:
-        # Create message
-        msg = MIMEMultipart()
-        msg["Subject"] = subject
-        msg["From"] = smtp_user
-        msg["To"] = to_email
-        
-        # Add body to email
-        msg.attach(MIMEText(body, "plain"))
-        
-        # Gmail SMTP configuration
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            if smtp_use_tls:
-                server.starttls()  # Enable security
-            server.login(smtp_user, smtp_password)
-            text = msg.as_string()
-            server.sendmail(smtp_user, to_email, text)
-            
-        print(f"✅ Email sent successfully to {to_email}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error sending email to {to_email}: {e}")
-        return False
+        metrics.smtp_send_failures_total.inc("not_configured", amount=len(emails))
+        return [False] * len(emails)
+    messages = [(to_email, build_message(pool.user, to_email, subject, body)) for to_email, subject, body in emails]
+    results = pool.send_many(messages)
+    for (to_email, _), ok in zip(messages, results):
+        if ok:
+            print(f"✅ Email sent successfully to {to_email}")
+    return results
+
+def send_email(to_email: str, subject: str, body: str):
+    """
+    Send a single email through the shared SMTP pool
+    """
+    return send_many([(to_email, subject, body)])[0]
 
 def test_email_connection():
     """
     Test email configuration
     """
-    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    
-    if not smtp_user or not smtp_password:
+    import smtplib
+
+    if not settings.smtp_user or not settings.smtp_password:
         print("❌ Email configuration missing")
         return False
         
     try:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
+        with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
             server.starttls()
-            server.login(smtp_user, smtp_password)
+            server.login(settings.smtp_user, settings.smtp_password)
             print("✅ Email connection successful!")
             return True
     except Exception as e:
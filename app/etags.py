@@ -0,0 +1,35 @@
+import hashlib
+
+def item_etag(version: int) -> str:
+    """Strong ETag of a single task or project"""
+    return f'"{version}"'
+
+def list_etag(rows) -> str:
+    """Strong ETag of a list response, from the (id, version) of each row in order"""
+    digest = hashlib.sha1()
+    for row_id, version in rows:
+        digest.update(f"{row_id}:{version};".encode())
+    return f'"{digest.hexdigest()}"'
+
+def _tags(header: str):
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def none_match(header: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison), i.e. the client copy is current"""
+    if not header:
+        return False
+    tags = _tags(header)
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+def if_match_versions(header: str):
+    """
+    Versions an If-Match header accepts, or None when any version will do
+    (no header, or ``*``). Weak and malformed tags never match.
+    """
+    if not header or "*" in _tags(header):
+        return None
+    versions = []
+    for tag in _tags(header):
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.append(int(tag[1:-1]))
+    return versions
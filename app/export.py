@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy import select
+from app import crud, models
+from app.database import SessionLocal, AsyncSessionLocal, DATABASE_ASYNC
+from app.settings import get_settings
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_BATCH_SIZE = get_settings().export_batch_size
+EXPORT_COLUMNS = [
+    models.Task.id,
+    models.Task.title,
+    models.Task.description,
+    models.Task.status,
+    models.Task.priority,
+    models.Task.due_date,
+    models.Task.project_id,
+    models.Task.assigned_user_id,
+]
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+def export_statement(user_id: int, **filters):
+    """Column-only SELECT of the user's tasks in id order; rows never enter an identity map"""
+    return (
+        select(*EXPORT_COLUMNS)
+        .join(models.Project, models.Task.project_id == models.Project.id)
+        .where(*crud.task_filters(user_id, **filters))
+        .order_by(models.Task.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+def _plain(value):
+    if isinstance(value, models.TaskStatus):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def encode_ndjson(rows, header: bool):
+    return "".join(json.dumps(dict(zip(EXPORT_FIELDS, map(_plain, row)))) + "\n" for row in rows)
+
+def encode_csv(rows, header: bool):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv}
+
+class _Encoder:
+    """Turns row batches into (optionally gzip-compressed) byte chunks"""
+
+    def __init__(self, format: str, compress: bool):
+        self.encode = ENCODERS[format]
+        self.compressor = zlib.compressobj(wbits=31) if compress else None
+        self.first = True
+
+    def chunk(self, rows) -> bytes:
+        data = self.encode(rows, self.first).encode()
+        self.first = False
+        return self.compressor.compress(data) if self.compressor else data
+
+    def finish(self) -> bytes:
+        if self.compressor:
+            return self.compressor.flush()
+        # An empty CSV export still gets its header row
+        return self.encode([], True).encode() if self.first else b""
+
+def iter_export(user_id: int, format: str, compress: bool = False, **filters):
+    """Sync export stream; runs on the threadpool with its own session and a server-side cursor"""
+    encoder = _Encoder(format, compress)
+    db = SessionLocal()
+    try:
+        result = db.execute(export_statement(user_id, **filters))
+        for rows in result.partitions():
+            chunk = encoder.chunk(rows)
+            if chunk:
+                yield chunk
+    finally:
+        db.close()
+    yield encoder.finish()
+
+async def aiter_export(user_id: int, format: str, compress: bool = False, **filters):
+    """Async export stream over AsyncSession.stream"""
+    encoder = _Encoder(format, compress)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(export_statement(user_id, **filters))
+        async for rows in result.partitions():
+            chunk = encoder.chunk(rows)
+            if chunk:
+                yield chunk
+    yield encoder.finish()
+
+def stream_export(user_id: int, format: str, compress: bool = False, **filters):
+    """Byte stream of the user's tasks for a StreamingResponse"""
+    if DATABASE_ASYNC:
+        return aiter_export(user_id, format, compress, **filters)
+    return iter_export(user_id, format, compress, **filters)
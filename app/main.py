@@ -1,13 +1,149 @@
+import time
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.datastructures import MutableHeaders
+from app import admission, cache, database, metrics
 from app.routes import projects, tasks, auth
-from app.database import create_db_and_tables
+from app.database import track_queries, warn_repeated
+from app.notifications import start_dispatcher, stop_dispatcher
+from app.reminders import start_scheduler, stop_scheduler
+from app.email_utils import close_smtp_pool
+
+def route_template(scope) -> str:
+    """Path template of the route that served ``scope`` (e.g. /tasks/{id}), so metric labels stay bounded"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+# Scopes of the requests being served; only touched on the event loop thread
+_in_flight = {}
+
+def _count_in_flight():
+    counts = {}
+    for scope in list(_in_flight.values()):
+        # Routing fills in scope["route"]; until then the request is "unmatched"
+        key = (scope["method"], route_template(scope))
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+metrics.Callback("http_requests_in_flight", "Requests being served", ("method", "route"), _count_in_flight)
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, in-flight requests and SQL statement counts per route.
+
+    With SQL_DEBUG the request's query count and time are also sent in
+    Server-Timing and likely N+1 patterns are printed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+        _in_flight[id(scope)] = scope
+        try:
+            with track_queries() as stats:
+                async def send_with_timing(message):
+                    nonlocal status
+                    if message["type"] == "http.response.start":
+                        status = message["status"]
+                        if database.SQL_DEBUG:
+                            MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+                    await send(message)
+
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            del _in_flight[id(scope)]
+            route = route_template(scope)
+            metrics.http_request_duration_seconds.observe(time.perf_counter() - started, scope["method"], route, status)
+            metrics.db_queries_per_request.observe(stats.count, route)
+        if database.SQL_DEBUG:
+            warn_repeated(stats, f"{scope['method']} {route}")
+
+async def read_body(receive):
+    """The whole request body, or None if the client disconnected first"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+class AdmissionControlMiddleware:
+    """
+    Turn requests to the routes of ``admission.controller`` away with 429 or
+    503 and Retry-After once their rate or concurrency limits are reached,
+    before any database or bcrypt work starts. Their body is read up front
+    for the email rate limit and replayed to the route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        controller = admission.controller
+        route = controller.route(scope["method"], scope["path"]) if controller and scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        body = await read_body(receive)
+        if body is None:
+            return
+        client = scope.get("client")
+        rejection = await controller.admit(route, client[0] if client else None, admission.request_email(body))
+        if rejection:
+            detail = "Too many requests, please retry later" if rejection.status == 429 else "Server busy, please retry"
+            response = JSONResponse({"detail": detail}, status_code=rejection.status, headers={"Retry-After": str(rejection.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        replayed = False
+        async def replay():
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        try:
+            await self.app(scope, replay, send)
+        finally:
+            controller.release(route)
 
 app = FastAPI(title="Task Management API")
+# Middleware added later wraps what was added before it: admission control
+# runs inside request metrics, so requests it turns away are still measured
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(projects.router)
 app.include_router(tasks.router)
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+metrics.Callback(
+    "list_cache_requests_total", "List cache lookups", ("outcome",),
+    lambda: {("hit",): cache.stats()["hits"], ("miss",): cache.stats()["misses"]}, kind="counter",
+)
+
+# The schema is not created here: run `alembic upgrade head` before starting the app
 @app.on_event("startup")
 async def startup_event():
-    create_db_and_tables()
\ No newline at end of file
+    start_dispatcher()
+    start_scheduler()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_scheduler()
+    stop_dispatcher()
+    close_smtp_pool()
@@ -0,0 +1,132 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Every metric keeps one shard of values per thread, so an update is a dict
+write on memory no other thread touches: no locks and no contention on the
+request path. Shards are only summed when ``/metrics`` is scraped.
+"""
+import threading
+from bisect import bisect_left
+
+# Seconds; covers sub-millisecond cache hits up to slow SMTP round trips
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        _registry.append(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            # Only taken once per thread, when it first updates this metric
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> list:
+        with self._shards_lock:
+            return [dict(shard) for shard in self._shards]
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _samples(self) -> list:
+        totals = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return [f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}" for labels, value in sorted(totals.items())]
+
+class Callback(_Metric):
+    """
+    Values read at scrape time from ``collect()``, which returns
+    ``{label values: value}``; for state that is already tracked elsewhere.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple, collect, kind: str = "gauge"):
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+        self.kind = kind
+
+    def _samples(self) -> list:
+        return [f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}" for labels, value in sorted(self.collect().items())]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            # One slot per bucket plus +Inf, then the sum
+            counts = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _samples(self) -> list:
+        totals = {}
+        for shard in self._snapshot():
+            for labels, counts in shard.items():
+                merged = totals.setdefault(labels, [0] * len(counts))
+                for i, value in enumerate(counts):
+                    merged[i] += value
+        lines = []
+        for labels, counts in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+http_request_duration_seconds = Histogram("http_request_duration_seconds", "Request latency until the response is fully sent", ("method", "route", "status"))
+db_queries_per_request = Histogram("db_queries_per_request", "SQL statements run per request", ("route",), buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100))
+db_pool_checkout_seconds = Histogram("db_pool_checkout_seconds", "Time to get a connection from the pool, including waiting for one", ("engine",))
+password_hash_seconds = Histogram("password_hash_seconds", "bcrypt time per operation on the hashing pool", ("operation",))
+smtp_send_seconds = Histogram("smtp_send_seconds", "Time to send one email over a pooled SMTP session")
+smtp_send_failures_total = Counter("smtp_send_failures_total", "Emails that could not be sent", ("reason",))
+admission_rejections_total = Counter("admission_rejections_total", "Requests turned away by admission control", ("route", "reason"))
+celery_task_duration_seconds = Histogram("celery_task_duration_seconds", "Celery task run time", ("task", "state"), buckets=DEFAULT_BUCKETS + (30.0, 60.0, 300.0))
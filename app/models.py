@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Index, DDL, event, func, literal_column
+from sqlalchemy.dialects import postgresql  # registers the full-text search functions used below
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm.attributes import get_history
 from datetime import datetime
 import enum
 
@@ -10,27 +12,123 @@ class TaskStatus(str, enum.Enum):
     in_progress = "in_progress"
     completed = "completed"
 
+def task_search_vector(title, description):
+    """
+    Postgres full-text document for a task. Queries must build it from the
+    same expression so the planner can match it to ix_tasks_search.
+    """
+    text = func.coalesce(title, literal_column("''")).op("||")(literal_column("' '")).op("||")(func.coalesce(description, literal_column("''")))
+    return func.to_tsvector(literal_column("'english'::regconfig"), text)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
+    name = Column(String)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    # Bumped whenever the password changes; tokens carry it, so a change revokes them
+    password_version = Column(Integer, nullable=False, default=1, server_default="1")
+
+@event.listens_for(User, "before_update")
+def _bump_password_version(mapper, connection, target):
+    # The login rehash of an unchanged password is written with a Core UPDATE, so it does not get here
+    if get_history(target, "hashed_password").has_changes():
+        target.password_version = (target.password_version or 0) + 1
 
 class Project(Base):
     __tablename__ = "projects"
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
+    name = Column(String)
     description = Column(String)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    version = Column(Integer, nullable=False)
+
+    # Bumped by every ORM update, which also only applies if the row still has
+    # the version it was loaded with (optimistic concurrency, ETags)
+    __mapper_args__ = {"version_id_col": version}
 
 class Task(Base):
     __tablename__ = "tasks"
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, index=True)
+    title = Column(String)
     description = Column(String)
     status = Column(Enum(TaskStatus), default=TaskStatus.pending)
     priority = Column(Integer)
     due_date = Column(DateTime)
-    project_id = Column(Integer, ForeignKey("projects.id"))
-    assigned_user_id = Column(Integer, ForeignKey("users.id"))
\ No newline at end of file
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+    assigned_user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    version = Column(Integer, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
+
+    # Shaped after the filters and sorts GET /tasks accepts (always scoped by
+    # project) and the overdue summary's status/due_date range scan.
+    __table_args__ = (
+        Index("ix_tasks_project_status_due_date", "project_id", "status", "due_date"),
+        Index("ix_tasks_project_priority", "project_id", "priority"),
+        Index("ix_tasks_project_due_date", "project_id", "due_date"),
+        Index("ix_tasks_status_due_date", "status", "due_date"),
+        Index("ix_tasks_search", task_search_vector(title, description), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+# On SQLite the same documents live in an external-content FTS5 table that
+# triggers keep in sync with every insert, update and delete on tasks.
+TASK_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+for statement in TASK_FTS_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Task.__table__, "before_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
+
+class ProjectTaskStats(Base):
+    """Task count per (project, status), kept current by the crud task writes"""
+    __tablename__ = "project_task_stats"
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(Enum(TaskStatus), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class ProjectDeletion(Base):
+    """Progress of a project being deleted in the background; kept after the project is gone"""
+    __tablename__ = "project_deletions"
+    project_id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    status = Column(String, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    deleted = Column(Integer, nullable=False, default=0)
+    error = Column(String)
+    started_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+class TaskReminder(Base):
+    """A due-date reminder already queued in the outbox, so it goes out once across workers and restarts"""
+    __tablename__ = "task_reminders"
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    kind = Column(String, primary_key=True)
+    due_date = Column(DateTime, primary_key=True)
+    queued_at = Column(DateTime, default=datetime.utcnow)
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    task_id = Column(Integer)
+    event = Column(String)
+    status = Column(String, default="pending")
+    attempts = Column(Integer, default=0)
+    last_error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
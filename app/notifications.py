@@ -0,0 +1,276 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app import models
+from app.email_utils import send_email, send_many, SMTP_POOL_SIZE
+from app.settings import get_settings
+
+# "inprocess" runs a dispatcher thread inside the API process, "celery" leaves
+# draining to the dispatch_notifications beat task, "off" disables both.
+settings = get_settings()
+NOTIFICATION_DISPATCHER = settings.notification_dispatcher
+NOTIFICATION_BATCH_SIZE = settings.notification_batch_size
+NOTIFICATION_POLL_INTERVAL = settings.notification_poll_interval
+NOTIFICATION_MAX_ATTEMPTS = settings.notification_max_attempts
+NOTIFICATION_BACKOFF_SECONDS = settings.notification_backoff_seconds
+NOTIFICATION_CLAIM_TIMEOUT = settings.notification_claim_timeout
+OVERDUE_SUMMARY_YIELD_PER = settings.overdue_summary_yield_per
+OVERDUE_SUMMARY_REPORT = settings.overdue_summary_report
+
+_dispatcher_thread = None
+_dispatcher_stop = threading.Event()
+
+def render_notification(user: models.User, task: models.Task, event: str):
+    """Build the subject and body for a task notification email"""
+    if event == "assigned":
+        subject = f"New Task Assigned: {task.title}"
+        body = f"""
+Hello {user.name},
+
+You have been assigned a new task:
+
+Task: {task.title}
+Description: {task.description or 'No description provided'}
+Priority: {task.priority or 'Not set'}
+Due Date: {task.due_date or 'Not set'}
+Status: {task.status}
+
+Please log in to the Task Management System to view more details.
+
+Best regards,
+Task Management System
+        """
+    elif event == "status_changed":
+        subject = f"Task Status Updated: {task.title}"
+        body = f"""
+Hello {user.name},
+
+The status of your task has been updated:
+
+Task: {task.title}
+New Status: {task.status}
+Description: {task.description or 'No description provided'}
+Due Date: {task.due_date or 'Not set'}
+
+Please log in to the Task Management System to view more details.
+
+Best regards,
+Task Management System
+        """
+    elif event in ("due_soon", "due"):
+        subject = f"Task Due {'Soon' if event == 'due_soon' else 'Now'}: {task.title}"
+        body = f"""
+Hello {user.name},
+
+Your task is {'coming due' if event == 'due_soon' else 'due now'}:
+
+Task: {task.title}
+Due Date: {task.due_date}
+Status: {task.status}
+Priority: {task.priority or 'Not set'}
+
+Please log in to the Task Management System to view more details.
+
+Best regards,
+Task Management System
+        """
+    else:
+        subject = f"Task Notification: {task.title}"
+        body = f"""
+Hello {user.name},
+
+There has been an update to your task:
+
+Task: {task.title}
+Event: {event.replace('_', ' ').title()}
+Status: {task.status}
+
+Please log in to the Task Management System to view more details.
+
+Best regards,
+Task Management System
+        """
+    return subject, body.strip()
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff between delivery attempts"""
+    return timedelta(seconds=NOTIFICATION_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+def dispatch_pending(db: Session, batch_size: int = NOTIFICATION_BATCH_SIZE, now: datetime = None):
+    """
+    Deliver one batch of due outbox rows and return (rows processed, emails sent).
+
+    Users and tasks for the whole batch are loaded with one query each. On
+    Postgres the rows are locked with SKIP LOCKED so several dispatchers can
+    drain the outbox concurrently; elsewhere they are claimed first (see
+    ``claim_pending``).
+    """
+    now = now or datetime.utcnow()
+    outbox = models.NotificationOutbox
+    due = (
+        db.query(outbox)
+        .filter(outbox.status.in_(("pending", "sending")), outbox.next_attempt_at <= now)
+        .order_by(outbox.id)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        entries = due.with_for_update(skip_locked=True).all()
+    else:
+        entries = claim_pending(db, due, now)
+    if not entries:
+        return 0, 0
+
+    user_ids = {entry.user_id for entry in entries}
+    task_ids = {entry.task_id for entry in entries}
+    users = {user.id: user for user in db.query(models.User).filter(models.User.id.in_(user_ids))}
+    tasks = {task.id: task for task in db.query(models.Task).filter(models.Task.id.in_(task_ids))}
+
+    deliverable = []
+    for entry in entries:
+        user = users.get(entry.user_id)
+        task = tasks.get(entry.task_id)
+        entry.attempts += 1
+        if not user or not task:
+            entry.status = "dropped"
+            entry.last_error = f"User {entry.user_id} or Task {entry.task_id} not found"
+            continue
+        subject, body = render_notification(user, task, entry.event)
+        deliverable.append((entry, (user.email, subject, body)))
+
+    # The whole batch goes out over a single pooled SMTP session
+    results = send_many([email for _, email in deliverable]) if deliverable else []
+    sent = 0
+    for (entry, _), ok in zip(deliverable, results):
+        if ok:
+            entry.status = "sent"
+            entry.sent_at = now
+            entry.last_error = None
+            sent += 1
+        elif entry.attempts >= NOTIFICATION_MAX_ATTEMPTS:
+            entry.status = "failed"
+            entry.last_error = "Delivery failed"
+        else:
+            entry.status = "pending"
+            entry.next_attempt_at = now + backoff_delay(entry.attempts)
+            entry.last_error = "Delivery failed"
+    db.commit()
+    return len(entries), sent
+
+def claim_pending(db: Session, due, now: datetime):
+    """
+    The rows of the ``due`` outbox query that this dispatcher claimed, for
+    databases without SKIP LOCKED (SQLite ignores FOR UPDATE).
+
+    A single UPDATE ... SET status = 'sending' WHERE id IN (due) ... RETURNING,
+    committed right away, takes the rows; writes are serialized, so a row
+    another dispatcher claimed first is no longer due and is not taken again. A claim is due again after NOTIFICATION_CLAIM_TIMEOUT
+    seconds, in case its dispatcher died before finishing the batch.
+    """
+    outbox = models.NotificationOutbox
+    claimed = db.scalars(
+        update(outbox.__table__)
+        .where(outbox.id.in_(due.with_entities(outbox.id).subquery().select()))
+        .values(status="sending", next_attempt_at=now + timedelta(seconds=NOTIFICATION_CLAIM_TIMEOUT))
+        .returning(outbox.id)
+    ).all()
+    db.commit()
+    if not claimed:
+        return []
+    return db.query(outbox).filter(outbox.id.in_(claimed)).order_by(outbox.id).all()
+
+def drain_outbox(db: Session, batch_size: int = NOTIFICATION_BATCH_SIZE):
+    """Dispatch batches until nothing due is left and return how many emails were sent"""
+    total = 0
+    while True:
+        processed, sent = dispatch_pending(db, batch_size)
+        total += sent
+        if processed < batch_size:
+            return total
+
+def overdue_query(db: Session, now: datetime):
+    """(owner_id, email, title, due_date) for every overdue pending task, ordered by owner"""
+    return (
+        db.query(models.User.id, models.User.email, models.Task.title, models.Task.due_date)
+        .select_from(models.Task)
+        .join(models.Project, models.Task.project_id == models.Project.id)
+        .join(models.User, models.Project.owner_id == models.User.id)
+        .filter(models.Task.status == models.TaskStatus.pending, models.Task.due_date <= now)
+        .order_by(models.Project.owner_id, models.Task.due_date, models.Task.id)
+    )
+
+def send_overdue_summaries(db: Session, now: datetime = None, workers: int = SMTP_POOL_SIZE, report: bool = OVERDUE_SUMMARY_REPORT):
+    """
+    Email every project owner one digest of their overdue pending tasks.
+
+    Overdue tasks are read with a single streamed query ordered by owner, so
+    digests are built one owner at a time and memory does not grow with the
+    number of users or tasks. Digests are sent by a bounded pool of workers;
+    at most ``2 * workers`` digests are waiting to be sent at any time.
+
+    Returns a dict with the run's duration, rows scanned and emails sent,
+    which is also printed when ``report`` is true.
+    """
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    stats = {"rows_scanned": 0, "emails_sent": 0}
+    stats_lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(workers * 2)
+
+    def deliver(email, lines):
+        try:
+            body = "Your overdue tasks:\n" + "\n".join(lines)
+            if send_email(email, "Overdue Tasks Summary", body):
+                with stats_lock:
+                    stats["emails_sent"] += 1
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="overdue-summary") as executor:
+        for (_, email), rows in groupby(overdue_query(db, now).yield_per(OVERDUE_SUMMARY_YIELD_PER), key=itemgetter(0, 1)):
+            lines = []
+            for row in rows:
+                stats["rows_scanned"] += 1
+                lines.append(f"- {row.title} (Due: {row.due_date})")
+            in_flight.acquire()
+            executor.submit(deliver, email, lines)
+
+    stats["duration_seconds"] = round(time.perf_counter() - started, 3)
+    if report:
+        print(f"Overdue summary: {stats['rows_scanned']} rows scanned, {stats['emails_sent']} emails sent in {stats['duration_seconds']}s")
+    return stats
+
+def _dispatcher_loop():
+    from app.database import SessionLocal
+
+    while not _dispatcher_stop.is_set():
+        db = SessionLocal()
+        try:
+            drain_outbox(db)
+        except Exception as e:
+            db.rollback()
+            print(f"Notification dispatcher error: {e}")
+        finally:
+            db.close()
+        _dispatcher_stop.wait(NOTIFICATION_POLL_INTERVAL)
+
+def start_dispatcher():
+    """Start the in-process dispatcher thread if it is the configured mode"""
+    global _dispatcher_thread
+    if NOTIFICATION_DISPATCHER != "inprocess" or _dispatcher_thread is not None:
+        return
+    _dispatcher_stop.clear()
+    _dispatcher_thread = threading.Thread(target=_dispatcher_loop, name="notification-dispatcher", daemon=True)
+    _dispatcher_thread.start()
+
+def stop_dispatcher():
+    global _dispatcher_thread
+    if _dispatcher_thread is None:
+        return
+    _dispatcher_stop.set()
+    _dispatcher_thread.join(timeout=NOTIFICATION_POLL_INTERVAL + 1)
+    _dispatcher_thread = None
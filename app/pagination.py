@@ -0,0 +1,114 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from app import models
+
+# Columns GET /tasks may be sorted by; id is always appended as the tie-breaker
+TASK_SORT_COLUMNS = {
+    "id": models.Task.id,
+    "priority": models.Task.priority,
+    "due_date": models.Task.due_date,
+    "status": models.Task.status,
+}
+SORT_ORDERS = ("asc", "desc")
+
+class InvalidCursor(ValueError):
+    pass
+
+def sort_column(sort_by: str = None):
+    sort_by = sort_by or "id"
+    if sort_by not in TASK_SORT_COLUMNS:
+        raise ValueError(f"sort_by must be one of: {', '.join(TASK_SORT_COLUMNS)}")
+    return sort_by, TASK_SORT_COLUMNS[sort_by]
+
+def order_by_clauses(column, order: str):
+    """
+    ORDER BY for a keyset page.
+
+    NULLs sort last ascending and first descending (Postgres' defaults), so
+    a plain B-tree index on the column can serve both directions.
+    """
+    if column is models.Task.id:
+        return [column.asc() if order == "asc" else column.desc()]
+    if order == "asc":
+        return [column.asc().nulls_last(), models.Task.id.asc()]
+    return [column.desc().nulls_first(), models.Task.id.desc()]
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, models.TaskStatus):
+        return value.value
+    return value
+
+def _deserialize(sort_by: str, value):
+    if value is None:
+        return None
+    if sort_by == "due_date":
+        return datetime.fromisoformat(value)
+    if sort_by == "status":
+        return models.TaskStatus(value)
+    return int(value)
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode(cursor: str) -> dict:
+    return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+
+def encode_cursor(sort_by: str, order: str, task) -> str:
+    """Opaque cursor pointing just after ``task`` in the given ordering"""
+    sort_by = sort_by or "id"
+    return _encode({"s": sort_by, "o": order, "v": _serialize(getattr(task, sort_by)), "id": task.id})
+
+def decode_cursor(cursor: str, sort_by: str, order: str):
+    """Return (sort value, id) from a cursor issued for the same sort_by/order"""
+    try:
+        payload = _decode(cursor)
+        if payload["s"] != (sort_by or "id") or payload["o"] != order:
+            raise InvalidCursor("cursor was issued for a different sort order")
+        return _deserialize(payload["s"], payload["v"]), int(payload["id"])
+    except InvalidCursor:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("malformed cursor") from e
+
+def after_cursor(column, order: str, value, last_id: int):
+    """WHERE clause selecting rows strictly after (value, last_id)"""
+    id_col = models.Task.id
+    if column is id_col:
+        return id_col > last_id if order == "asc" else id_col < last_id
+    if order == "asc":
+        # Non-NULL values come first, then NULLs ordered by id
+        if value is None:
+            return and_(column.is_(None), id_col > last_id)
+        return or_(
+            column > value,
+            and_(column == value, id_col > last_id),
+            column.is_(None),
+        )
+    # Descending: NULLs come first, then non-NULL values
+    if value is None:
+        return or_(and_(column.is_(None), id_col < last_id), column.isnot(None))
+    return or_(
+        column < value,
+        and_(column == value, id_col < last_id),
+    )
+
+def encode_search_cursor(query: str, rank: float, task_id: int) -> str:
+    """Opaque cursor pointing just after a search hit; ``rank`` round-trips exactly through JSON"""
+    return _encode({"q": query, "r": rank, "id": task_id})
+
+def decode_search_cursor(cursor: str, query: str):
+    """Return (rank, id) from a cursor issued for the same search query"""
+    try:
+        payload = _decode(cursor)
+        if payload["q"] != query:
+            raise InvalidCursor("cursor was issued for a different search query")
+        return float(payload["r"]), int(payload["id"])
+    except InvalidCursor:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("malformed cursor") from e
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from app import metrics
+from app.settings import get_settings
+
+settings = get_settings()
+
+BCRYPT_ROUNDS = settings.bcrypt_rounds
+PASSWORD_HASH_WORKERS = settings.password_hash_workers
+PASSWORD_HASH_MAX_QUEUE = settings.password_hash_max_queue
+PASSWORD_HASH_TIMEOUT = settings.password_hash_timeout
+
+# min/max pin the cost factor, so hashes made with any other cost report
+# needs_update and are re-hashed on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+class PasswordHashPoolBusy(Exception):
+    """Raised when a hash job could not start before PASSWORD_HASH_TIMEOUT"""
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL, so ``workers`` threads use up to that many cores.
+    At most ``max_queue`` jobs may wait for a thread; callers beyond that, or
+    whose job has not finished within ``timeout`` seconds, get
+    PasswordHashPoolBusy.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE, timeout: float = PASSWORD_HASH_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or running"""
+        return self._pending
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                raise PasswordHashPoolBusy()
+            self._pending += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            # Drops the job if it is still queued; a running hash finishes unobserved
+            future.cancel()
+            raise PasswordHashPoolBusy()
+
+hasher = PasswordHasher()
+
+def _timed(operation: str, fn):
+    """``fn`` recording its own run time (not the queue wait) in password_hash_seconds"""
+    def run(*args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            metrics.password_hash_seconds.observe(time.perf_counter() - started, operation)
+    return run
+
+_hash = _timed("hash", pwd_context.hash)
+_verify = _timed("verify", pwd_context.verify_and_update)
+
+async def hash_password(password: str) -> str:
+    return await hasher.run(_hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str):
+    """
+    Check a password off the event loop.
+
+    Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+    uses an outdated scheme or cost factor and should be replaced.
+    """
+    return await hasher.run(_verify, plain_password, hashed_password)
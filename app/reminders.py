@@ -0,0 +1,324 @@
+"""
+Due-date reminders, sent per task shortly before and at its due_date.
+
+A ReminderScheduler holds the reminders of the tasks due in the next
+REMINDER_LEAD_MINUTES + REMINDER_WINDOW_MINUTES in a min-heap ordered by
+when they fire. It reads them with due_date range queries over the
+(status, due_date) index, one slice of that window at a time as the clock
+moves on, so its work follows the tasks coming due rather than the size of
+the tasks table. The crud writes tell it about tasks created, changed or
+deleted; a heap entry whose task has changed since is skipped when it comes
+up. Every REMINDER_RESYNC_SECONDS the window is read again, which picks up
+writes made by other processes; a restarted scheduler starts with such a
+read, going back REMINDER_GRACE_MINUTES for reminders missed while down.
+
+A reminder that fires is checked against its task and claimed in
+task_reminders in the transaction that queues its notification in the
+outbox, so it goes out once however many workers run a scheduler.
+"""
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import models
+from app.settings import get_settings
+
+# "inprocess" runs a scheduler thread inside the API process, "off" disables it
+settings = get_settings()
+REMINDER_SCHEDULER = settings.reminder_scheduler
+REMINDER_LEAD = timedelta(minutes=settings.reminder_lead_minutes)
+REMINDER_WINDOW = timedelta(minutes=settings.reminder_window_minutes)
+REMINDER_GRACE = timedelta(minutes=settings.reminder_grace_minutes)
+REMINDER_RESYNC = timedelta(seconds=settings.reminder_resync_seconds)
+REMINDER_POLL_INTERVAL = settings.reminder_poll_interval
+# Tasks per IN (...) list when checking fired reminders
+REMINDER_BATCH_SIZE = 500
+
+DUE_SOON = "due_soon"
+DUE = "due"
+OPEN_STATUSES = (models.TaskStatus.pending, models.TaskStatus.in_progress)
+
+scheduler = None
+_scheduler_thread = None
+_scheduler_stop = threading.Event()
+
+def _utc(value: datetime):
+    """Naive UTC, like every other datetime the app stores"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+class ReminderScheduler:
+    """
+    Min-heap of ``(fire_at, task_id, kind, due_date)`` reminders.
+
+    ``load(start, end)`` returns ``(task_id, due_date)`` of the open tasks
+    due in ``[start, end)`` and ``clock()`` the current naive UTC time.
+    ``pop_due`` is called by one thread; ``update`` and ``remove`` may be
+    called from any and never wait for ``load``.
+    """
+
+    def __init__(self, load, clock=datetime.utcnow, lead=REMINDER_LEAD, window=REMINDER_WINDOW, grace=REMINDER_GRACE, resync=REMINDER_RESYNC):
+        self.load = load
+        self.clock = clock
+        self.lead = lead
+        self.window = window
+        self.grace = grace
+        self.resync = resync
+        # Set when a reminder earlier than any other is added, to cut the scheduler thread's sleep short
+        self.wakeup = threading.Event()
+        self.loaded = 0
+        self._heap = []
+        # The due_date each scheduled task's heap entries are for; other entries of the task are stale
+        self._due = {}
+        self._fired = set()
+        self._loaded_until = None
+        self._resync_at = None
+        # Task writes that arrive while the window is being read, by task id
+        self._writes = None
+        self._lock = threading.Lock()
+
+    def _schedule(self, task_id: int, due_date: datetime, now: datetime):
+        if due_date < now - self.grace or due_date >= self._loaded_until:
+            return
+        self._due[task_id] = due_date
+        for fire_at, kind in ((due_date - self.lead, DUE_SOON), (due_date, DUE)):
+            if (kind == DUE_SOON and due_date <= now) or (task_id, kind, due_date) in self._fired:
+                continue
+            entry = (fire_at, task_id, kind, due_date)
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                self.wakeup.set()
+
+    def _advance(self, now: datetime):
+        """
+        Read the slice of the window the clock has moved into, or all of it
+        when a resync is due. The query runs outside the lock, so task writes
+        are not held up by it; writes that arrive meanwhile are applied to the
+        current heap and recorded, then applied again on top of what was read.
+        """
+        with self._lock:
+            horizon = now + self.lead + self.window
+            resync = self._resync_at is None or now >= self._resync_at
+            if resync:
+                start = now - self.grace
+            elif self._loaded_until - now < self.lead + self.window / 2:
+                start = self._loaded_until
+            else:
+                return
+            self._writes = {}
+        try:
+            rows = self.load(start, horizon)
+        except BaseException:
+            with self._lock:
+                self._writes = None
+            raise
+        with self._lock:
+            if resync:
+                self._heap, self._due = [], {}
+                self._fired = {key for key in self._fired if key[2] >= now - self.grace}
+                self._resync_at = now + self.resync
+            self._loaded_until = horizon
+            for task_id, due_date in rows:
+                self.loaded += 1
+                self._schedule(task_id, due_date, now)
+            for task_id, (due_date, scheduled) in self._writes.items():
+                self._apply(task_id, due_date, scheduled, now)
+            self._writes = None
+
+    def pop_due(self) -> list:
+        """``(task_id, kind, due_date)`` of the reminders whose time has come, in firing order"""
+        now = self.clock()
+        self._advance(now)
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                _, task_id, kind, due_date = heapq.heappop(self._heap)
+                key = (task_id, kind, due_date)
+                if self._due.get(task_id) != due_date or key in self._fired:
+                    continue
+                self._fired.add(key)
+                if kind == DUE:
+                    del self._due[task_id]
+                due.append(key)
+            return due
+
+    def requeue(self, reminders: list):
+        """Put back reminders from ``pop_due`` that could not be queued, to fire on the next tick"""
+        with self._lock:
+            for task_id, kind, due_date in reminders:
+                self._fired.discard((task_id, kind, due_date))
+                if self._due.setdefault(task_id, due_date) == due_date:
+                    heapq.heappush(self._heap, (self.clock(), task_id, kind, due_date))
+
+    def _apply(self, task_id: int, due_date: datetime, scheduled: bool, now: datetime):
+        if self._writes is not None:
+            self._writes[task_id] = (due_date, scheduled)
+        if self._loaded_until is None or (scheduled and self._due.get(task_id) == due_date):
+            return
+        self._due.pop(task_id, None)
+        if scheduled:
+            self._schedule(task_id, due_date, now)
+
+    def update(self, task_id: int, due_date: datetime, status):
+        """Reschedule a task that was created or changed"""
+        due_date = _utc(due_date)
+        scheduled = due_date is not None and models.TaskStatus(status) in OPEN_STATUSES
+        with self._lock:
+            self._apply(task_id, due_date, scheduled, self.clock())
+            self._compact()
+
+    def remove(self, task_ids):
+        """Drop the reminders of deleted tasks"""
+        with self._lock:
+            for task_id in task_ids:
+                self._apply(task_id, None, False, None)
+            self._compact()
+
+    def _compact(self):
+        # Stale entries wait in the heap until they come up; rebuild it once they outnumber the live ones
+        if len(self._heap) > 4 * len(self._due) + 64:
+            self._heap = [entry for entry in self._heap if self._due.get(entry[1]) == entry[3]]
+            heapq.heapify(self._heap)
+
+    def seconds_until_next(self, limit: float) -> float:
+        """Seconds until the earliest reminder fires, at most ``limit``"""
+        with self._lock:
+            if not self._heap:
+                return limit
+            return max(0.0, min(limit, (self._heap[0][0] - self.clock()).total_seconds()))
+
+    def __len__(self):
+        return len(self._due)
+
+def due_tasks(db: Session, start: datetime, end: datetime):
+    """(id, due_date) of the open tasks due in [start, end), a range scan of ix_tasks_status_due_date"""
+    return db.execute(
+        select(models.Task.id, models.Task.due_date)
+        .where(models.Task.status.in_(OPEN_STATUSES), models.Task.due_date >= start, models.Task.due_date < end)
+    ).all()
+
+def _claim(db: Session, claims: list) -> set:
+    """Insert ``claims`` into task_reminders and return the ``(task_id, kind, due_date)`` that were not there yet"""
+    reminders = models.TaskReminder.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        upsert = postgresql.insert(reminders) if dialect == "postgresql" else sqlite.insert(reminders)
+        statement = upsert.on_conflict_do_nothing().returning(reminders.c.task_id, reminders.c.kind, reminders.c.due_date)
+        return {tuple(row) for row in db.execute(statement.values(claims))}
+    claimed = set()
+    for claim in claims:
+        key = (claim["task_id"], claim["kind"], claim["due_date"])
+        if db.get(models.TaskReminder, key) is None:
+            db.execute(insert(reminders).values(**claim))
+            claimed.add(key)
+    return claimed
+
+def enqueue_reminders(db: Session, reminders: list, now: datetime = None) -> int:
+    """
+    Queue the notifications of ``reminders`` (``(task_id, kind, due_date)``)
+    and return how many were queued.
+
+    A reminder is dropped if its task is gone, completed or now due at
+    another time, or if it is already in task_reminders. Notifications go
+    to the assignee, or to the project owner when the task is unassigned.
+    """
+    now = now or datetime.utcnow()
+    queued = 0
+    for start in range(0, len(reminders), REMINDER_BATCH_SIZE):
+        batch = reminders[start:start + REMINDER_BATCH_SIZE]
+        tasks = {
+            row.id: row
+            for row in db.execute(
+                select(models.Task.id, models.Task.due_date, models.Task.status, models.Task.assigned_user_id, models.Project.owner_id)
+                .join(models.Project, models.Task.project_id == models.Project.id)
+                .where(models.Task.id.in_({task_id for task_id, _, _ in batch}))
+            )
+        }
+        claims = [
+            {"task_id": task_id, "kind": kind, "due_date": due_date, "queued_at": now}
+            for task_id, kind, due_date in batch
+            if task_id in tasks and tasks[task_id].due_date == due_date and tasks[task_id].status in OPEN_STATUSES
+        ]
+        if not claims:
+            continue
+        claimed = _claim(db, claims)
+        notifications = [
+            {"user_id": tasks[task_id].assigned_user_id or tasks[task_id].owner_id, "task_id": task_id, "event": kind}
+            for task_id, kind, due_date in batch
+            if (task_id, kind, due_date) in claimed
+        ]
+        if notifications:
+            db.execute(insert(models.NotificationOutbox), notifications)
+        queued += len(notifications)
+    db.commit()
+    return queued
+
+def fire_due(db: Session, reminder_scheduler: ReminderScheduler) -> int:
+    """Queue the notifications of every reminder whose time has come and return how many were queued"""
+    due = reminder_scheduler.pop_due()
+    if not due:
+        return 0
+    try:
+        return enqueue_reminders(db, due, reminder_scheduler.clock())
+    except Exception:
+        db.rollback()
+        reminder_scheduler.requeue(due)
+        raise
+
+def task_changed(task_id: int, due_date: datetime, status):
+    """Tell the running scheduler about a created or updated task; call after commit"""
+    if scheduler is not None:
+        scheduler.update(task_id, due_date, status)
+
+def tasks_removed(task_ids):
+    """Tell the running scheduler about deleted tasks; call after commit"""
+    if scheduler is not None and task_ids:
+        scheduler.remove(task_ids)
+
+def _load_due(start: datetime, end: datetime):
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return due_tasks(db, start, end)
+    finally:
+        db.close()
+
+def _scheduler_loop():
+    from app.database import SessionLocal
+
+    while not _scheduler_stop.is_set():
+        scheduler.wakeup.clear()
+        timeout = REMINDER_POLL_INTERVAL
+        db = SessionLocal()
+        try:
+            fire_due(db, scheduler)
+            timeout = scheduler.seconds_until_next(REMINDER_POLL_INTERVAL)
+        except Exception as e:
+            print(f"Reminder scheduler error: {e}")
+        finally:
+            db.close()
+        scheduler.wakeup.wait(timeout)
+
+def start_scheduler():
+    """Start the in-process reminder scheduler if it is the configured mode"""
+    global scheduler, _scheduler_thread
+    if REMINDER_SCHEDULER != "inprocess" or _scheduler_thread is not None:
+        return
+    _scheduler_stop.clear()
+    scheduler = ReminderScheduler(_load_due)
+    _scheduler_thread = threading.Thread(target=_scheduler_loop, name="reminder-scheduler", daemon=True)
+    _scheduler_thread.start()
+
+def stop_scheduler():
+    global scheduler, _scheduler_thread
+    if _scheduler_thread is None:
+        return
+    _scheduler_stop.set()
+    scheduler.wakeup.set()
+    _scheduler_thread.join(timeout=REMINDER_POLL_INTERVAL + 1)
+    _scheduler_thread = None
+    scheduler = None
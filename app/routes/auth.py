@@ -1,28 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
+from jose import jwt
 from datetime import datetime, timedelta
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from app import schemas, models
-from app.database import get_db
-from passlib.context import CryptContext
+from app import schemas, models, crud
+from app.database import get_session, run_db
+from app.dependencies import SECRET_KEY, ALGORITHM, password_fingerprint
+from app import passwords
 from pydantic import BaseModel, EmailStr
-from dotenv import load_dotenv
-import os
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Set default secret key for development
-SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production-12345678901234567890")
-ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-security = HTTPBearer()
-
 # Token response model
 class TokenResponse(BaseModel):
     access_token: str
@@ -52,11 +42,24 @@ class UserResponse(BaseModel):
         orm_mode = True
 
 # Helper functions
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    try:
+        return await passwords.verify_password(plain_password, hashed_password)
+    except passwords.PasswordHashPoolBusy:
+        raise password_pool_busy()
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    try:
+        return await passwords.hash_password(password)
+    except passwords.PasswordHashPoolBusy:
+        raise password_pool_busy()
+
+def password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please retry",
+        headers={"Retry-After": "1"},
+    )
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -65,31 +68,35 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(models.User).filter(models.User.email == email).first()
+def find_user(db: Session, email: str):
+    """Look up a user and end the transaction, so no connection is held while bcrypt runs"""
+    user = crud.get_user_by_email(db, email)
+    if user:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+def save_password_hash(db: Session, user: models.User, hashed_password: str):
+    # A Core UPDATE: the password is the same, so its version and the user's tokens must not change
+    users = models.User.__table__
+    db.execute(update(users).where(users.c.id == user.id).values(hashed_password=hashed_password))
+    db.commit()
+    return db.get(models.User, user.id)
+
+async def authenticate_user(db, email: str, password: str):
+    user = await run_db(db, find_user, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_password(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        # Stored with an outdated cost factor; replace it now that we know the password
+        user = await run_db(db, save_password_hash, user, new_hash)
     return user
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    """Get current user from Bearer token"""
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = int(payload.get("sub"))
-        if user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if user is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-        return user
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(user: SignupRequest, db: Session = Depends(get_db)):
+async def signup(user: SignupRequest, db=Depends(get_session)):
     """
     Create a new user account
     """
@@ -101,23 +108,15 @@ async def signup(user: SignupRequest, db: Session = Depends(get_db)):
         )
     
     # Check if user already exists
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if db_user:
+    if await run_db(db, find_user, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(
-        name=user.name,
-        email=user.email, 
-        hashed_password=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    hashed_password = await get_password_hash(user.password)
+    db_user = await run_db(db, crud.create_user, user, hashed_password)
     
     return UserResponse(
         id=db_user.id,
@@ -127,13 +126,13 @@ async def signup(user: SignupRequest, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=TokenResponse)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db=Depends(get_session)):
     """
     Login with email and password to get access token
     
     Use the returned access_token in the Authorization header as: Bearer <access_token>
     """
-    user = authenticate_user(db, login_data.email, login_data.password)
+    user = await authenticate_user(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -141,7 +140,7 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data={"sub": str(user.id), "pwd": password_fingerprint(user)})
     return TokenResponse(
         access_token=access_token,
         email=user.email,
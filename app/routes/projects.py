@@ -1,34 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app import schemas, crud
-from app.dependencies import get_db, get_current_user
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response, status
+from app import schemas, crud, deletions, etags, serialization
+from app.database import run_db
+from app.dependencies import get_session, get_current_user, Principal
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 @router.post("/", response_model=schemas.Project)
-def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    return crud.create_project(db, project, current_user.id)
+async def create_project(project: schemas.ProjectCreate, db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    return await run_db(db, crud.create_project, project, current_user.id)
 
 @router.get("/", response_model=list[schemas.Project])
-def list_projects(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    return crud.get_projects(db, current_user.id)
+async def list_projects(fields: str = None, if_none_match: str = Header(None), db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """
+    Send the `ETag` as `If-None-Match` to get `304 Not Modified` while no project changed.
+    `fields` (e.g. `id,name`) limits each project to those fields.
+    """
+    try:
+        fields = serialization.parse_fields(fields, crud.PROJECT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if if_none_match:
+        etag = etags.list_etag(await run_db(db, crud.get_project_versions, current_user.id))
+        if etags.none_match(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+    projects = await run_db(db, crud.get_projects, current_user.id, fields)
+    etag = etags.list_etag((project.id, project.version) for project in projects)
+    return serialization.RowsResponse(serialization.encode_rows(projects, fields), headers={"ETag": etag})
+
+@router.get("/stats", response_model=list[schemas.ProjectStats])
+async def list_project_stats(db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """Task counts by status and overdue count for every project of the caller"""
+    return await run_db(db, crud.get_project_stats, current_user.id)
+
+@router.get("/{id}/stats", response_model=schemas.ProjectStats)
+async def get_project_stats(id: int, db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    stats = await run_db(db, crud.get_project_stats, current_user.id, id)
+    if not stats:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return stats[0]
 
 @router.get("/{id}", response_model=schemas.Project)
-def get_project(id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    project = crud.get_project(db, id, current_user.id)
+async def get_project(id: int, response: Response, if_none_match: str = Header(None), db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    if if_none_match:
+        version = await run_db(db, crud.get_project_version, id, current_user.id)
+        if version is not None and etags.none_match(if_none_match, etags.item_etag(version)):
+            return Response(status_code=304, headers={"ETag": etags.item_etag(version)})
+    project = await run_db(db, crud.get_project, id, current_user.id)
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    response.headers["ETag"] = etags.item_etag(project.version)
     return project
 
 @router.patch("/{id}", response_model=schemas.Project)
-def update_project(id: int, project: schemas.ProjectCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    updated_project = crud.update_project(db, id, project, current_user.id)
+async def update_project(id: int, project: schemas.ProjectUpdate, response: Response, if_match: str = Header(None), db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """
+    Update only the fields sent. With `If-Match`, the update only applies if the project
+    still has that ETag; otherwise `412`.
+    """
+    try:
+        updated_project = await run_db(db, crud.update_project, id, project, current_user.id, etags.if_match_versions(if_match))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except crud.VersionConflict:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Project has been modified")
     if not updated_project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    response.headers["ETag"] = etags.item_etag(updated_project.version)
     return updated_project
 
-@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    project = crud.delete_project(db, id, current_user.id)
-    if not project:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
\ No newline at end of file
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT, responses={202: {"model": schemas.ProjectDeletion}})
+async def delete_project(id: int, background_tasks: BackgroundTasks, background: bool = None, db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """
+    Delete the project and all of its tasks. Projects with more than
+    PROJECT_DELETE_SYNC_LIMIT tasks, or any with `background=true`, are deleted
+    after the response: it is `202` with the deletion's progress, which
+    `GET /projects/{id}/deletion` keeps reporting.
+    """
+    if not await run_db(db, crud.get_project, id, current_user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    if background is None:
+        background = await run_db(db, crud.count_project_tasks, id) > deletions.PROJECT_DELETE_SYNC_LIMIT
+    if not background:
+        if not await run_db(db, crud.delete_project, id, current_user.id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    record, started = await run_db(db, crud.start_project_deletion, id, current_user.id)
+    if started:
+        background_tasks.add_task(deletions.run_project_deletion, id, current_user.id)
+    body = serialization.encode_row(record, crud.PROJECT_DELETION_FIELDS)
+    return serialization.RowsResponse(body, status_code=status.HTTP_202_ACCEPTED, headers={"Location": f"/projects/{id}/deletion"})
+
+@router.get("/{id}/deletion", response_model=schemas.ProjectDeletion)
+async def get_project_deletion(id: int, db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """Progress of the project's background deletion"""
+    record = await run_db(db, crud.get_project_deletion, id, current_user.id)
+    if not record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No deletion of this project")
+    return record
\ No newline at end of file
@@ -1,151 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app import schemas, crud, models
-from app.dependencies import get_db, get_current_user
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from app import schemas, crud, pagination, export, etags, serialization
+from app.database import run_db
+from app.dependencies import get_session, get_current_user, Principal
 # from app.celery_config import send_task_notification  # Disabled for now
 from datetime import datetime
-import smtplib
-import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
-def send_email(to_email: str, subject: str, body: str):
-    """Send email using Gmail SMTP"""
-    try:
-        # Get SMTP configuration from environment variables
-        smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-        smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        smtp_user = os.getenv("SMTP_USER")
-        smtp_password = os.getenv("SMTP_PASSWORD")
-        smtp_use_tls = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
-        
-        if not smtp_user or not smtp_password:
-            print("SMTP credentials not configured. Email not sent.")
-            return False
-        
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = smtp_user
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        # Add body to email
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Create SMTP session
-        server = smtplib.SMTP(smtp_host, smtp_port)
-        if smtp_use_tls:
-            server.starttls()  # Enable security
-        server.login(smtp_user, smtp_password)
-        
-        # Send email
-        text = msg.as_string()
-        server.sendmail(smtp_user, to_email, text)
-        server.quit()
-        
-        print(f"Email sent successfully to {to_email}")
-        return True
-        
-    except Exception as e:
-        print(f"Failed to send email to {to_email}: {str(e)}")
-        return False
-
-def send_notification_sync(user_id: int, task_id: int, event: str, db: Session):
-    """Send notification with actual email functionality"""
-    try:
-        # Get user and task details from database
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        task = db.query(models.Task).filter(models.Task.id == task_id).first()
-        
-        if not user or not task:
-            print(f"User {user_id} or Task {task_id} not found")
-            return
-        
-        # Create email content based on event
-        if event == "assigned":
-            subject = f"New Task Assigned: {task.title}"
-            body = f"""
-Hello {user.name},
-
-You have been assigned a new task:
-
-Task: {task.title}
-Description: {task.description or 'No description provided'}
-Priority: {task.priority or 'Not set'}
-Due Date: {task.due_date or 'Not set'}
-Status: {task.status}
-
-Please log in to the Task Management System to view more details.
-
-Best regards,
-Task Management System
-            """
-        elif event == "status_changed":
-            subject = f"Task Status Updated: {task.title}"
-            body = f"""
-Hello {user.name},
-
-The status of your task has been updated:
-
-Task: {task.title}
-New Status: {task.status}
-Description: {task.description or 'No description provided'}
-Due Date: {task.due_date or 'Not set'}
-
-Please log in to the Task Management System to view more details.
-
-Best regards,
-Task Management System
-            """
-        else:
-            subject = f"Task Notification: {task.title}"
-            body = f"""
-Hello {user.name},
-
-There has been an update to your task:
-
-Task: {task.title}
-Event: {event.replace('_', ' ').title()}
-Status: {task.status}
-
-Please log in to the Task Management System to view more details.
-
-Best regards,
-Task Management System
-            """
-        
-        # Send email
-        success = send_email(user.email, subject, body.strip())
-        
-        if success:
-            print(f"Notification sent successfully: User {user_id} - Task {task_id} - Event: {event}")
-        else:
-            print(f"Failed to send notification: User {user_id} - Task {task_id} - Event: {event}")
-            
-    except Exception as e:
-        print(f"Error sending notification: {str(e)}")
-
-def send_notification_sync_old(user_id: int, task_id: int, event: str):
-    """Placeholder function for sending notifications without Celery"""
-    print(f"Notification: User {user_id} - Task {task_id} - Event: {event}")
-    # You can implement email sending here directly if needed
+def page_headers(rows, per_page: int, sort_by: str, order: str):
+    """ETag and, for a full page, X-Next-Cursor of a GET /tasks page (tasks or version rows)"""
+    headers = {"ETag": etags.list_etag((row.id, row.version) for row in rows)}
+    if rows and len(rows) == per_page:
+        headers["X-Next-Cursor"] = pagination.encode_cursor(sort_by, order, rows[-1])
+    return headers
 
 @router.post("/", response_model=schemas.Task)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    db_task = crud.create_task(db, task, current_user.id)
-    if task.assigned_user_id:
-        # Use synchronous notification with email sending
-        send_notification_sync(task.assigned_user_id, db_task.id, "assigned", db)
-    return db_task
+async def create_task(task: schemas.TaskCreate, db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    # Assignment notifications are queued in the same transaction and delivered by the dispatcher
+    return await run_db(db, crud.create_task, task, current_user.id)
 
 @router.get("/", response_model=list[schemas.Task])
-def list_tasks(
+async def list_tasks(
     status: str = None,
     priority: int = None,
     due_date: datetime = None,
@@ -154,33 +30,137 @@ def list_tasks(
     order: str = "asc",
     page: int = 1,
     per_page: int = 10,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    cursor: str = None,
+    fields: str = None,
+    if_none_match: str = Header(None),
+    db=Depends(get_session),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    List tasks. Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page;
+    `page` is kept for offset pagination and is ignored when `cursor` is given.
+    Send the page's `ETag` as `If-None-Match` to get `304 Not Modified` while it is unchanged.
+    `fields` (e.g. `id,title,status`) limits each task to those fields.
+    """
+    args = (current_user.id, status, priority, due_date, project_id, sort_by, order, page, per_page, cursor)
+    try:
+        fields = serialization.parse_fields(fields, crud.TASK_FIELDS)
+        if if_none_match:
+            # Answer revalidation from (id, version) only, without loading or serializing tasks
+            headers = page_headers(await run_db(db, crud.get_task_versions, *args), per_page, sort_by, order)
+            if etags.none_match(if_none_match, headers["ETag"]):
+                return Response(status_code=304, headers=headers)
+        tasks = await run_db(db, crud.get_tasks, *args, fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Column rows go straight to JSON bytes, skipping response_model validation
+    return serialization.RowsResponse(serialization.encode_rows(tasks, fields), headers=page_headers(tasks, per_page, sort_by, order))
+
+@router.get("/search", response_model=list[schemas.Task])
+async def search_tasks(
+    response: Response,
+    q: str,
+    project_id: int = None,
+    per_page: int = 10,
+    cursor: str = None,
+    db=Depends(get_session),
+    current_user: Principal = Depends(get_current_user)
 ):
-    return crud.get_tasks(db, current_user.id, status, priority, due_date, project_id, sort_by, order, page, per_page)
+    """
+    Search the caller's task titles and descriptions for every word of `q`, best match first.
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page.
+    """
+    try:
+        rows = await run_db(db, crud.search_tasks, current_user.id, q, project_id, per_page, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rows and len(rows) == per_page:
+        task, rank = rows[-1]
+        response.headers["X-Next-Cursor"] = pagination.encode_search_cursor(crud.search_terms(q), rank, task.id)
+    return [task for task, _ in rows]
+
+@router.get("/export")
+async def export_tasks(
+    format: str = "ndjson",
+    gzip: bool = False,
+    status: str = None,
+    priority: int = None,
+    due_date: datetime = None,
+    project_id: int = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Stream all of the caller's tasks matching the `GET /tasks` filters as NDJSON or CSV.
+    With `gzip=true` the body is sent with `Content-Encoding: gzip`.
+    """
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(export.EXPORT_FORMATS)}")
+    headers = {"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    body = export.stream_export(current_user.id, format, gzip, status=status, priority=priority, due_date=due_date, project_id=project_id)
+    return StreamingResponse(body, media_type=export.EXPORT_FORMATS[format], headers=headers)
+
+def check_bulk_size(items: list):
+    if len(items) > crud.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"At most {crud.BULK_MAX_ITEMS} items per request")
+
+@router.post("/bulk", response_model=list[schemas.BulkItemResult])
+async def bulk_create_tasks(request: schemas.TaskBulkCreateRequest, db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """Create many tasks in one transaction; each item gets its own status (201 or 404)"""
+    check_bulk_size(request.items)
+    return await run_db(db, crud.bulk_create_tasks, request.items, current_user.id)
+
+@router.patch("/bulk", response_model=list[schemas.BulkItemResult])
+async def bulk_update_tasks(request: schemas.TaskBulkUpdateRequest, db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """Replace many tasks in one transaction; each item gets its own status (200, 400 for a repeated id, or 404)"""
+    check_bulk_size(request.items)
+    try:
+        return await run_db(db, crud.bulk_update_tasks, request.items, current_user.id)
+    except crud.VersionConflict:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Tasks were modified concurrently; retry the request")
+
+@router.delete("/bulk", response_model=list[schemas.BulkItemResult])
+async def bulk_delete_tasks(request: schemas.TaskBulkDeleteRequest, db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """Delete many tasks in one transaction; each id gets its own status (204 or 404)"""
+    check_bulk_size(request.ids)
+    return await run_db(db, crud.bulk_delete_tasks, request.ids, current_user.id)
 
 @router.get("/{id}", response_model=schemas.Task)
-def get_task(id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    task = crud.get_task(db, id, current_user.id)
+async def get_task(id: int, fields: str = None, if_none_match: str = Header(None), db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """`fields` (e.g. `id,title,status`) limits the task to those fields"""
+    try:
+        fields = serialization.parse_fields(fields, crud.TASK_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if if_none_match:
+        version = await run_db(db, crud.get_task_version, id, current_user.id)
+        if version is not None and etags.none_match(if_none_match, etags.item_etag(version)):
+            return Response(status_code=304, headers={"ETag": etags.item_etag(version)})
+    task = await run_db(db, crud.get_task, id, current_user.id, fields)
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    return task
+    return serialization.RowsResponse(serialization.encode_row(task, fields), headers={"ETag": etags.item_etag(task.version)})
 
 @router.patch("/{id}", response_model=schemas.Task)
-def update_task(id: int, task: schemas.TaskCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    db_task = crud.get_task(db, id, current_user.id)
-    if not db_task:
+async def update_task(id: int, task: schemas.TaskUpdate, response: Response, if_match: str = Header(None), db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    """
+    Update only the fields sent. With `If-Match`, the update only applies if the task
+    still has that ETag; otherwise `412`.
+    """
+    try:
+        updated_task = await run_db(db, crud.update_task, id, task, current_user.id, etags.if_match_versions(if_match))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except crud.VersionConflict:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Task has been modified")
+    if not updated_task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    old_status = db_task.status
-    updated_task = crud.update_task(db, id, task, current_user.id)
-    if task.assigned_user_id and task.assigned_user_id != db_task.assigned_user_id:
-        send_notification_sync(task.assigned_user_id, id, "assigned", db)
-    if task.status and task.status != old_status:
-        send_notification_sync(updated_task.assigned_user_id, id, "status_changed", db)
+    response.headers["ETag"] = etags.item_etag(updated_task.version)
     return updated_task
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_task(id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    task = crud.delete_task(db, id, current_user.id)
+async def delete_task(id: int, db=Depends(get_session), current_user: Principal = Depends(get_current_user)):
+    task = await run_db(db, crud.delete_task, id, current_user.id)
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from app.models import TaskStatus
 
 class UserBase(BaseModel):
@@ -24,13 +24,39 @@ class ProjectBase(BaseModel):
 class ProjectCreate(ProjectBase):
     pass
 
+class ProjectUpdate(BaseModel):
+    """Partial project update: only the fields sent are written"""
+    name: Optional[str] = None
+    description: Optional[str] = None
+
 class Project(ProjectBase):
     id: int
     owner_id: int
+    version: int
+
+    class Config:
+        orm_mode = True
+
+class ProjectDeletion(BaseModel):
+    """Progress of a background project deletion; status is running, completed or failed"""
+    project_id: int
+    status: str
+    total: int
+    deleted: int
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
+class ProjectStats(BaseModel):
+    project_id: int
+    total: int
+    overdue: int
+    by_status: Dict[str, int]
+
 class TaskBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -43,8 +69,38 @@ class TaskBase(BaseModel):
 class TaskCreate(TaskBase):
     pass
 
+class TaskUpdate(BaseModel):
+    """Partial task update: only the fields sent are written"""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[TaskStatus] = None
+    priority: Optional[int] = None
+    due_date: Optional[datetime] = None
+    project_id: Optional[int] = None
+    assigned_user_id: Optional[int] = None
+
 class Task(TaskBase):
     id: int
+    version: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class TaskBulkUpdate(TaskCreate):
+    id: int
+
+class TaskBulkCreateRequest(BaseModel):
+    items: List[TaskCreate]
+
+class TaskBulkUpdateRequest(BaseModel):
+    items: List[TaskBulkUpdate]
+
+class TaskBulkDeleteRequest(BaseModel):
+    ids: List[int]
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: int
+    id: Optional[int] = None
+    detail: Optional[str] = None
+    task: Optional[Task] = None
@@ -0,0 +1,64 @@
+"""
+JSON responses built straight from column rows.
+
+The read routes hand plain SELECT rows here instead of ORM objects that a
+response_model would validate and FastAPI would then re-encode. orjson
+encodes them when it is installed; otherwise the stdlib json module does.
+"""
+import json
+from datetime import date
+from enum import Enum
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def dumps(value) -> bytes:
+    """Compact JSON bytes; datetimes as ISO 8601, enums as their values"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+class RowsResponse(Response):
+    """``application/json`` response whose content is already-encoded bytes"""
+    media_type = "application/json"
+
+def parse_fields(fields: str, allowed) -> tuple:
+    """
+    The comma-separated ``fields`` of a sparse-fieldset request, in the
+    order of ``allowed``; every allowed field when ``fields`` is empty.
+    Raises ValueError for a field not in ``allowed`` or when ``fields``
+    names none at all (e.g. ``","``).
+    """
+    if not fields:
+        return tuple(allowed)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(allowed)
+    if unknown or not requested:
+        raise ValueError(f"fields must be among: {', '.join(allowed)}")
+    return tuple(field for field in allowed if field in requested)
+
+def row_dict(row, fields: tuple) -> dict:
+    return {field: getattr(row, field) for field in fields}
+
+def encode_row(row, fields: tuple) -> bytes:
+    """One column row (anything with attributes named after ``fields``) as a JSON object"""
+    return dumps(row_dict(row, fields))
+
+def encode_rows(rows, fields: tuple) -> bytes:
+    """Column rows as a JSON array of objects with just ``fields``"""
+    if not rows:
+        return b"[]"
+    # Rows of one query share their column order, so look the positions up once
+    positions = [rows[0]._fields.index(field) for field in fields]
+    pairs = list(zip(fields, positions))
+    return dumps([{field: row[position] for field, position in pairs} for row in rows])
@@ -0,0 +1,18 @@
+"""
+Recompute project_task_stats from the tasks table.
+
+    python -m app.tools.rebuild_stats
+"""
+from app.crud import rebuild_project_task_stats
+from app.database import SessionLocal
+
+def main():
+    db = SessionLocal()
+    try:
+        rows = rebuild_project_task_stats(db)
+        print(f"✅ Rebuilt project_task_stats ({rows} rows)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
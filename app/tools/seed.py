@@ -0,0 +1,222 @@
+"""
+Generate a synthetic dataset and bulk load it into DATABASE_URL.
+
+Rows get ids after the highest existing one, so the tool can add to a
+database that already holds data. Tasks get a realistic mix of statuses,
+priorities, due dates (past and upcoming) and assignees; a few users own
+most projects and a few projects hold most tasks.
+
+    python -m app.tools.seed --users 100000 --projects 1000000 --tasks 10000000
+    python -m app.tools.seed --tasks 10000000 --drop-indexes
+
+Postgres is loaded with COPY, other databases with a raw executemany,
+one transaction per --chunk rows. Every user gets the same password, hashed
+once up front.
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from itertools import accumulate, islice
+from datetime import datetime, timedelta
+from sqlalchemy import func, inspect, select, text
+from app import crud, models
+from app.database import SessionLocal, engine
+from app.passwords import pwd_context
+
+PRIORITY_WEIGHTS = (10, 25, 35, 20, 10)  # priorities 1-5
+# Overdue tasks are mostly done; upcoming ones mostly not started
+PAST_STATUS_WEIGHTS = {models.TaskStatus.completed: 60, models.TaskStatus.in_progress: 25, models.TaskStatus.pending: 15}
+FUTURE_STATUS_WEIGHTS = {models.TaskStatus.completed: 10, models.TaskStatus.in_progress: 35, models.TaskStatus.pending: 55}
+VERBS = ("Write", "Review", "Fix", "Design", "Test", "Deploy", "Plan", "Refactor", "Document", "Migrate", "Benchmark", "Update")
+NOUNS = (
+    "login page", "billing report", "search index", "release notes", "API client", "database schema", "onboarding flow",
+    "email templates", "dashboard", "caching layer", "export job", "settings screen", "audit log", "payment webhook",
+)
+WORDS = "the a for with customer team feedback issue sprint deadline budget draft final meeting metrics backlog bug feature".split()
+SEEDED_TABLES = (models.User.__table__, models.Project.__table__, models.Task.__table__)
+FTS_TRIGGERS = ("tasks_fts_insert", "tasks_fts_delete", "tasks_fts_update")
+
+def skewed(rng: random.Random, count: int) -> int:
+    """Index in range(count) biased towards 0, so low ids get most of the rows"""
+    return int(count * rng.random() ** 2)
+
+USER_COLUMNS = ("id", "name", "email", "hashed_password")
+PROJECT_COLUMNS = ("id", "name", "description", "owner_id", "version")
+TASK_COLUMNS = ("id", "title", "description", "status", "priority", "due_date", "project_id", "assigned_user_id", "version")
+
+def generate_users(first_id: int, count: int, hashed_password: str):
+    for user_id in range(first_id, first_id + count):
+        yield user_id, f"Seed User {user_id}", f"seed{user_id}@example.com", hashed_password
+
+def generate_projects(first_id: int, count: int, user_ids: range, rng: random.Random, owners: list):
+    """Projects with skewed ownership; appends each project's owner to ``owners``"""
+    for project_id in range(first_id, first_id + count):
+        owner_id = user_ids[skewed(rng, len(user_ids))]
+        owners.append(owner_id)
+        yield project_id, f"{rng.choice(NOUNS).capitalize()} {project_id}", " ".join(rng.choices(WORDS, k=8)), owner_id, 1
+
+def generate_tasks(first_id: int, count: int, project_ids: range, owners: list, user_ids: range, now: datetime, rng: random.Random):
+    statuses = {
+        past: ([status.name for status in weights], list(accumulate(weights.values())))
+        for past, weights in ((True, PAST_STATUS_WEIGHTS), (False, FUTURE_STATUS_WEIGHTS))
+    }
+    priorities, priority_weights = range(1, 6), list(accumulate(PRIORITY_WEIGHTS))
+    for task_id in range(first_id, first_id + count):
+        index = skewed(rng, len(project_ids))
+        due_date = None if rng.random() < 0.1 else now + timedelta(minutes=rng.randint(-90 * 24 * 60, 180 * 24 * 60))
+        choices, weights = statuses[due_date is not None and due_date < now]
+        roll = rng.random()
+        # Unassigned, assigned to the project owner, or to anyone else
+        assignee = None if roll < 0.3 else owners[index] if roll < 0.8 else user_ids[rng.randrange(len(user_ids))]
+        yield (
+            task_id,
+            f"{rng.choice(VERBS)} {rng.choice(NOUNS)}",
+            " ".join(rng.choices(WORDS, k=rng.randint(5, 20))),
+            rng.choices(choices, cum_weights=weights)[0],
+            rng.choices(priorities, cum_weights=priority_weights)[0],
+            # The text form SQLAlchemy itself stores on SQLite; every other database parses it too
+            None if due_date is None else due_date.isoformat(" "),
+            project_ids[index],
+            assignee,
+            1,
+        )
+
+def _copy(conn, table, columns: tuple, chunk: list):
+    """COPY ``chunk`` into ``table`` through the raw psycopg connection"""
+    buffer = io.StringIO()
+    # None is written as an empty unquoted field, which COPY's CSV format reads as NULL
+    csv.writer(buffer).writerows(chunk)
+    statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+        else:
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+def load(table, columns: tuple, rows, chunk_size: int) -> int:
+    """
+    Insert the tuples in ``rows`` into ``table``, one transaction per
+    ``chunk_size`` rows; returns the row count. Values bypass SQLAlchemy's
+    type processing, so they must already be in database form.
+    """
+    placeholder = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+    statement = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+    loaded = 0
+    with engine.connect() as conn:
+        synchronous = None
+        if engine.dialect.name == "sqlite":
+            # Only this load's connection: a crash mid-load loses the load, never earlier data
+            synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+            conn.exec_driver_sql("PRAGMA synchronous = OFF")
+            conn.commit()
+        try:
+            while chunk := list(islice(rows, chunk_size)):
+                with conn.begin():
+                    if engine.dialect.name == "postgresql":
+                        _copy(conn, table, columns, chunk)
+                    else:
+                        conn.exec_driver_sql(statement, chunk)
+                loaded += len(chunk)
+        finally:
+            if synchronous is not None:
+                # The connection goes back to the pool with the engine profile's setting
+                conn.rollback()
+                conn.exec_driver_sql(f"PRAGMA synchronous = {int(synchronous)}")
+                conn.commit()
+    return loaded
+
+def _next_id(conn, table) -> int:
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+def drop_indexes():
+    """Drop the secondary indexes (and SQLite's full-text triggers) of the seeded tables; returns what was dropped"""
+    dropped = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in SEEDED_TABLES:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing and not index.unique:
+                    index.drop(conn)
+                    dropped.append(index)
+        if engine.dialect.name == "sqlite":
+            for trigger in FTS_TRIGGERS:
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    return dropped
+
+def rebuild_indexes(dropped: list):
+    with engine.begin() as conn:
+        for index in dropped:
+            index.create(conn)
+        if engine.dialect.name == "sqlite":
+            for statement in models.TASK_FTS_DDL[1:]:
+                conn.exec_driver_sql(statement)
+            conn.exec_driver_sql("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+def finish(conn):
+    """Move id sequences past the explicit ids and refresh planner statistics"""
+    if engine.dialect.name == "postgresql":
+        for table in SEEDED_TABLES:
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))"))
+    conn.exec_driver_sql("ANALYZE")
+
+def report(label: str, rows: int, seconds: float):
+    print(f"✅ {label}: {rows} rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=10000)
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--password", default="password123", help="password of every seeded user")
+    parser.add_argument("--chunk", type=int, default=50000, help="rows per transaction")
+    parser.add_argument("--drop-indexes", action="store_true", help="drop secondary indexes during the load and rebuild them after")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.users < 1 or (args.tasks and args.projects < 1):
+        parser.error("tasks need at least one project, and projects at least one user")
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        first_user, first_project, first_task = (_next_id(conn, table) for table in SEEDED_TABLES)
+    user_ids = range(first_user, first_user + args.users)
+    project_ids = range(first_project, first_project + args.projects)
+    hashed_password = pwd_context.hash(args.password)
+
+    dropped = []
+    if args.drop_indexes:
+        dropped = drop_indexes()
+        print(f"Dropped {len(dropped)} indexes")
+
+    owners = []
+    for table, columns, rows in (
+        (models.User.__table__, USER_COLUMNS, generate_users(first_user, args.users, hashed_password)),
+        (models.Project.__table__, PROJECT_COLUMNS, generate_projects(first_project, args.projects, user_ids, rng, owners)),
+        (models.Task.__table__, TASK_COLUMNS, generate_tasks(first_task, args.tasks, project_ids, owners, user_ids, datetime.utcnow(), rng)),
+    ):
+        table_started = time.perf_counter()
+        report(table.name, load(table, columns, rows, args.chunk), time.perf_counter() - table_started)
+
+    if args.drop_indexes:
+        index_started = time.perf_counter()
+        rebuild_indexes(dropped)
+        print(f"✅ Rebuilt indexes in {time.perf_counter() - index_started:.1f}s")
+    db = SessionLocal()
+    try:
+        crud.rebuild_project_task_stats(db)
+        finish(db.connection())
+        db.commit()
+    finally:
+        db.close()
+    report("total", args.users + args.projects + args.tasks, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    main()
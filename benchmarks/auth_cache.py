@@ -0,0 +1,59 @@
+"""
+Authenticated GET throughput with and without the verified-token cache.
+
+Drives the ASGI app in-process against a scratch SQLite database:
+
+    python -m benchmarks.auth_cache --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("NOTIFICATION_DISPATCHER", "off")
+os.environ.setdefault("REMINDER_SCHEDULER", "off")
+
+import httpx
+from app import dependencies
+from app.database import create_db_and_tables
+from app.main import app
+
+async def run(requests: int, concurrency: int, headers: dict):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.get("/projects/", headers=headers)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+async def login():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"email": "bench@example.com", "password": "bench-password"}
+        await client.post("/auth/signup", json={"name": "Bench", "confirm_password": credentials["password"], **credentials})
+        token = (await client.post("/auth/login", json=credentials)).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    headers = asyncio.run(login())
+    for label, cache_size in (("no cache", 0), ("cache", dependencies.AUTH_CACHE_SIZE)):
+        dependencies.token_cache = dependencies.TokenCache(cache_size)
+        elapsed = asyncio.run(run(args.requests, args.concurrency, headers))
+        print(f"{label:>8}: {args.requests / elapsed:8.1f} req/s ({elapsed:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Requests per second and p99 latency of GET /tasks in sync vs. async database mode.
+
+Each mode runs in its own interpreter (DATABASE_ASYNC is read at import
+time) against the same scratch SQLite database, with many concurrent
+in-process clients:
+
+    python -m benchmarks.db_modes --clients 500 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def drive(clients: int, requests: int):
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        credentials = {"email": "modes@example.com", "password": "modes-password"}
+        await client.post("/auth/signup", json={"name": "Modes", "confirm_password": credentials["password"], **credentials})
+        token = (await client.post("/auth/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        project = (await client.post("/projects/", json={"name": "Bench"}, headers=headers)).json()
+        for i in range(50):
+            await client.post("/tasks/", json={"title": f"Task {i}", "priority": i % 5 + 1, "project_id": project["id"]}, headers=headers)
+
+        remaining = iter(range(requests))
+        latencies = []
+
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get("/tasks/", params={"per_page": 20}, headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return {"rps": requests / elapsed, "p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99)}
+
+def child(args):
+    from app.database import create_db_and_tables
+
+    create_db_and_tables()
+    print(json.dumps(asyncio.run(drive(args.clients, args.requests))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    for mode in ("sync", "async"):
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+            DATABASE_ASYNC="true" if mode == "async" else "false",
+            NOTIFICATION_DISPATCHER="off",
+            REMINDER_SCHEDULER="off",
+        )
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.db_modes", "--child", "--clients", str(args.clients), "--requests", str(args.requests)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>5}: {result['rps']:8.1f} req/s  p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+GET /tasks latency while a storm of logins runs bcrypt on the same worker.
+
+Drives the ASGI app in-process on one event loop, the way a single uvicorn
+worker would serve it:
+
+    python -m benchmarks.login_storm --logins 200 --reads 300
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("NOTIFICATION_DISPATCHER", "off")
+os.environ.setdefault("REMINDER_SCHEDULER", "off")
+
+import httpx
+from app.database import create_db_and_tables
+from app.main import app
+
+CREDENTIALS = {"email": "storm@example.com", "password": "storm-password"}
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def reads(client, headers, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get("/tasks/", headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return latencies
+
+async def storm(client, logins, concurrency):
+    remaining = iter(range(logins))
+    statuses = []
+
+    async def worker():
+        for _ in remaining:
+            statuses.append((await client.post("/auth/login", json=CREDENTIALS)).status_code)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return statuses
+
+async def run(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await client.post("/auth/signup", json={"name": "Storm", "confirm_password": CREDENTIALS["password"], **CREDENTIALS})
+        token = (await client.post("/auth/login", json=CREDENTIALS)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        quiet = await reads(client, headers, args.reads)
+        storm_task = asyncio.create_task(storm(client, args.logins, args.concurrency))
+        busy = await reads(client, headers, args.reads)
+        statuses = await storm_task
+
+    for label, samples in (("idle", quiet), ("login storm", busy)):
+        print(f"{label:>11}: p50 {statistics.median(samples):7.2f} ms  p99 {percentile(samples, 99):7.2f} ms")
+    print(f"logins: {statuses.count(200)} ok, {statuses.count(503)} shed with 503, {statuses.count(429)} rate limited with 429")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--reads", type=int, default=300)
+    args = parser.parse_args()
+    create_db_and_tables()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
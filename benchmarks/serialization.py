@@ -0,0 +1,111 @@
+"""
+Per-row cost of turning a GET /tasks page into JSON bytes.
+
+Compares the ORM pipeline (Task objects validated from attributes into
+schemas.Task, dumped to JSON-able values and encoded with the stdlib json
+module, as FastAPI does for a response_model) with the column-row path of app.serialization, with
+orjson and with its stdlib fallback, over all fields and a sparse fieldset:
+
+    python -m benchmarks.serialization --rows 100 --repeat 200
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("NOTIFICATION_DISPATCHER", "off")
+os.environ.setdefault("REMINDER_SCHEDULER", "off")
+
+from pydantic import TypeAdapter
+from app import crud, models, schemas, serialization
+from app.database import SessionLocal, create_db_and_tables
+
+def seed(rows: int) -> int:
+    db = SessionLocal()
+    user = models.User(name="Bench", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    user_id = user.id
+    project = models.Project(name="Bench", owner_id=user_id)
+    db.add(project)
+    db.flush()
+    statuses = list(models.TaskStatus)
+    db.add_all(
+        models.Task(
+            title=f"Task {i}", description="Lorem ipsum dolor sit amet " * 4, status=statuses[i % 3], priority=i % 5 + 1,
+            due_date=datetime(2030, 1, 1) + timedelta(hours=i), project_id=project.id, assigned_user_id=user_id,
+        )
+        for i in range(rows)
+    )
+    db.commit()
+    db.close()
+    return user_id
+
+def orm_pipeline(user_id: int, rows: int):
+    adapter = TypeAdapter(list[schemas.Task])
+
+    def fetch(db):
+        return crud.get_tasks(db, user_id, per_page=rows)
+
+    def serialize(tasks):
+        validated = adapter.validate_python(tasks, from_attributes=True)
+        return json.dumps(adapter.dump_python(validated, mode="json"), separators=(",", ":")).encode()
+    return fetch, serialize
+
+def column_pipeline(user_id: int, rows: int, fields: tuple):
+    def fetch(db):
+        return crud.get_tasks(db, user_id, per_page=rows, fields=fields)
+
+    def serialize(tasks):
+        return serialization.encode_rows(tasks, fields)
+    return fetch, serialize
+
+def measure(fetch, serialize, rows: int, repeat: int):
+    """(fetch, serialize) microseconds per row, best of ``repeat``"""
+    best_fetch = best_serialize = float("inf")
+    for _ in range(repeat):
+        # A fresh session every time, so ORM rows are hydrated instead of found in the identity map
+        db = SessionLocal()
+        start = time.perf_counter()
+        page = fetch(db)
+        fetched = time.perf_counter()
+        serialize(page)
+        done = time.perf_counter()
+        db.close()
+        best_fetch = min(best_fetch, fetched - start)
+        best_serialize = min(best_serialize, done - fetched)
+    return best_fetch / rows * 1e6, best_serialize / rows * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="tasks per page")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    # Time the database and the encoders, not the list cache
+    crud.cache.backend = None
+    create_db_and_tables()
+    user_id = seed(args.rows)
+    sparse = ("title", "status", "id")
+    orjson = serialization.orjson
+    encoders = [("orjson", orjson)] if orjson else []
+    encoders.append(("stdlib json", None))
+
+    cases = [("ORM + schemas.Task + json", orjson, orm_pipeline(user_id, args.rows))]
+    for encoder, module in encoders:
+        cases.append((f"columns + {encoder}", module, column_pipeline(user_id, args.rows, crud.TASK_FIELDS)))
+        cases.append((f"columns + {encoder}, fields=id,title,status", module, column_pipeline(user_id, args.rows, sparse)))
+
+    print(f"{args.rows} rows per page, best of {args.repeat}; microseconds per row")
+    print(f"{'pipeline':<45} {'fetch':>8} {'serialize':>10} {'total':>8}")
+    for label, module, (fetch, serialize) in cases:
+        serialization.orjson = module
+        fetch_us, serialize_us = measure(fetch, serialize, args.rows, args.repeat)
+        print(f"{label:<45} {fetch_us:8.2f} {serialize_us:10.2f} {fetch_us + serialize_us:8.2f}")
+    serialization.orjson = orjson
+
+if __name__ == "__main__":
+    main()
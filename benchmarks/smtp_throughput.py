@@ -0,0 +1,63 @@
+"""
+SMTP delivery throughput: one connection per message vs. the pooled client.
+
+Runs against a local aiosmtpd stand-in so no real mail is sent:
+
+    python -m benchmarks.smtp_throughput --messages 2000
+"""
+import argparse
+import smtplib
+import socket
+import time
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from app.email_utils import SMTPPool, build_message
+
+class NullHandler:
+    async def handle_DATA(self, server, session, envelope):
+        return "250 OK"
+
+def accept_all(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def send_unpooled(host, port, messages):
+    """The previous behaviour: connect, log in and quit for every message"""
+    for to_email, msg in messages:
+        with smtplib.SMTP(host, port) as server:
+            server.login("bench@example.com", "secret")
+            server.sendmail("bench@example.com", to_email, msg.as_string())
+
+def send_pooled(host, port, messages):
+    pool = SMTPPool(host, port, "bench@example.com", "secret", use_tls=False)
+    try:
+        pool.send_many(messages)
+    finally:
+        pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    args = parser.parse_args()
+
+    controller = Controller(NullHandler(), hostname="127.0.0.1", port=free_port(), authenticator=accept_all, auth_require_tls=False)
+    controller.start()
+    try:
+        messages = [
+            (f"user{i}@example.com", build_message("bench@example.com", f"user{i}@example.com", "Overdue Tasks Summary", "Body"))
+            for i in range(args.messages)
+        ]
+        for label, sender in (("unpooled", send_unpooled), ("pooled", send_pooled)):
+            start = time.perf_counter()
+            sender(controller.hostname, controller.port, messages)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>9}: {args.messages / elapsed:8.1f} messages/s ({elapsed:.2f}s)")
+    finally:
+        controller.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Cold-start import cost of app.main, measured with ``python -X importtime``.
+
+Imports the app --runs times in fresh interpreters and fails (exit status
+1) if the median exceeds --budget-ms, or if a module that should only be
+imported on first use (the email and Celery stacks) is loaded at startup:
+
+    python -m benchmarks.startup --runs 5 --budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Modules that must stay out of the import graph of app.main
+LAZY_MODULES = ("smtplib", "email.mime.multipart", "email.mime.text", "celery")
+
+def import_times(module: str = "app.main") -> dict:
+    """``{imported module: (self µs, cumulative µs)}`` for a fresh ``import module``"""
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}",
+        PYTHONDONTWRITEBYTECODE="",
+    )
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], env=env, check=True, capture_output=True, text=True,
+    ).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    totals = [times["app.main"][1] / 1000 for times in runs]
+    median = statistics.median(totals)
+    last = runs[-1]
+    print(f"import app.main: median {median:.0f} ms over {args.runs} runs (min {min(totals):.0f}, max {max(totals):.0f}), {len(last)} modules")
+    print("Slowest modules by own import time:")
+    for name, (own, cumulative) in sorted(last.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {own / 1000:7.1f} ms  (cumulative {cumulative / 1000:7.1f} ms)  {name}")
+
+    eager = [name for name in LAZY_MODULES if name in last]
+    if eager:
+        print(f"❌ Imported at startup but should be lazy: {', '.join(eager)}")
+    if median > args.budget_ms:
+        print(f"❌ Over the {args.budget_ms:.0f} ms budget")
+    if eager or median > args.budget_ms:
+        sys.exit(1)
+    print(f"✅ Within the {args.budget_ms:.0f} ms budget")
+
+if __name__ == "__main__":
+    main()
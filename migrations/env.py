@@ -2,14 +2,20 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 from app.models import Base
-import os
+from app.settings import get_settings
 
 config = context.config
-config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
+# The same DATABASE_URL the app uses, from the environment or .env
+config.set_main_option("sqlalchemy.url", get_settings().database_url.replace("%", "%%"))
 
 fileConfig(config.config_file_name)
+
+def include_name(name, type_, parent_names):
+    # The SQLite FTS5 table and its shadow tables are created by migration 0004, not the models
+    return not (type_ == "table" and name.startswith("tasks_fts"))
+
 connectable = engine_from_config(config.get_section(config.config_ini_section), prefix="sqlalchemy.", poolclass=pool.NullPool)
 with connectable.connect() as connection:
-    context.configure(connection=connection, target_metadata=Base.metadata)
+    context.configure(connection=connection, target_metadata=Base.metadata, include_name=include_name)
     with context.begin_transaction():
         context.run_migrations()
\ No newline at end of file
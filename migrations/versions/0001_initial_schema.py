@@ -0,0 +1,59 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+The users, projects and tasks tables as the first release's create_all
+built them; databases created that way are marked with `alembic stamp
+0001` before upgrading (see the README for later starting points).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("email", sa.String()),
+        sa.Column("hashed_password", sa.String()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_name", "users", ["name"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "projects",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("description", sa.String()),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id")),
+    )
+    op.create_index("ix_projects_id", "projects", ["id"])
+    op.create_index("ix_projects_name", "projects", ["name"])
+
+    op.create_table(
+        "tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String()),
+        sa.Column("description", sa.String()),
+        sa.Column("status", sa.Enum("pending", "in_progress", "completed", name="taskstatus")),
+        sa.Column("priority", sa.Integer()),
+        sa.Column("due_date", sa.DateTime()),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id")),
+        sa.Column("assigned_user_id", sa.Integer(), sa.ForeignKey("users.id")),
+    )
+    op.create_index("ix_tasks_id", "tasks", ["id"])
+    op.create_index("ix_tasks_title", "tasks", ["title"])
+
+def downgrade():
+    op.drop_table("tasks")
+    op.drop_table("projects")
+    op.drop_table("users")
+    sa.Enum(name="taskstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,36 @@
+"""Notification outbox
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18
+
+The notification_outbox table as create_all built it before the query
+indexes of 0002.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001a"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("task_id", sa.Integer()),
+        sa.Column("event", sa.String()),
+        sa.Column("status", sa.String()),
+        sa.Column("attempts", sa.Integer()),
+        sa.Column("last_error", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("next_attempt_at", sa.DateTime()),
+        sa.Column("sent_at", sa.DateTime()),
+    )
+    op.create_index("ix_notification_outbox_id", "notification_outbox", ["id"])
+    op.create_index("ix_notification_outbox_next_attempt_at", "notification_outbox", ["next_attempt_at"])
+
+def downgrade():
+    op.drop_table("notification_outbox")
@@ -0,0 +1,46 @@
+"""Indexes matching the task list filters and the overdue summary
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18
+
+Adds composite indexes for the filter/sort combinations GET /tasks accepts
+(always scoped to the owner's projects), the overdue summary's
+status/due_date range and the notification dispatcher, and drops the
+title/name indexes no query uses. Check the plans with
+`python -m benchmarks.explain_plans`.
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001a"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_projects_owner_id", "projects", ["owner_id"])
+    op.create_index("ix_tasks_assigned_user_id", "tasks", ["assigned_user_id"])
+    op.create_index("ix_tasks_project_status_due_date", "tasks", ["project_id", "status", "due_date"])
+    op.create_index("ix_tasks_project_priority", "tasks", ["project_id", "priority"])
+    op.create_index("ix_tasks_project_due_date", "tasks", ["project_id", "due_date"])
+    op.create_index("ix_tasks_status_due_date", "tasks", ["status", "due_date"])
+    op.create_index("ix_notification_outbox_status_next_attempt_at", "notification_outbox", ["status", "next_attempt_at"])
+
+    op.drop_index("ix_notification_outbox_next_attempt_at", table_name="notification_outbox")
+    op.drop_index("ix_tasks_title", table_name="tasks")
+    op.drop_index("ix_users_name", table_name="users")
+    op.drop_index("ix_projects_name", table_name="projects")
+
+def downgrade():
+    op.create_index("ix_projects_name", "projects", ["name"])
+    op.create_index("ix_users_name", "users", ["name"])
+    op.create_index("ix_tasks_title", "tasks", ["title"])
+    op.create_index("ix_notification_outbox_next_attempt_at", "notification_outbox", ["next_attempt_at"])
+
+    op.drop_index("ix_notification_outbox_status_next_attempt_at", table_name="notification_outbox")
+    op.drop_index("ix_tasks_status_due_date", table_name="tasks")
+    op.drop_index("ix_tasks_project_due_date", table_name="tasks")
+    op.drop_index("ix_tasks_project_priority", table_name="tasks")
+    op.drop_index("ix_tasks_project_status_due_date", table_name="tasks")
+    op.drop_index("ix_tasks_assigned_user_id", table_name="tasks")
+    op.drop_index("ix_projects_owner_id", table_name="projects")
@@ -0,0 +1,34 @@
+"""Per-project task counters
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Creates project_task_stats and fills it from the existing tasks. Run
+`python -m app.tools.rebuild_stats` at any time to fix drift.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "project_task_stats",
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), primary_key=True),
+        sa.Column("status", postgresql.ENUM("pending", "in_progress", "completed", name="taskstatus", create_type=False), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO project_task_stats (project_id, status, count) "
+        "SELECT project_id, status, COUNT(*) FROM tasks "
+        "WHERE project_id IS NOT NULL AND status IS NOT NULL "
+        "GROUP BY project_id, status"
+    )
+
+def downgrade():
+    op.drop_table("project_task_stats")
@@ -0,0 +1,52 @@
+"""Full-text search over tasks
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Postgres gets a GIN index on the task search vector; SQLite gets the
+tasks_fts FTS5 table, the triggers that keep it in sync, and a rebuild
+from the existing tasks.
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# The expression of app.models.task_search_vector, which queries must repeat to use the index
+TASK_SEARCH_INDEX = (
+    "CREATE INDEX ix_tasks_search ON tasks USING gin "
+    "(to_tsvector('english'::regconfig, coalesce(title, '') || ' ' || coalesce(description, '')))"
+)
+# The tasks_fts table and triggers as of this revision, copied so later model changes cannot alter it
+TASK_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute(TASK_SEARCH_INDEX)
+    elif dialect == "sqlite":
+        for statement in TASK_FTS_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("ix_tasks_search", table_name="tasks")
+    elif dialect == "sqlite":
+        for trigger in ("tasks_fts_insert", "tasks_fts_delete", "tasks_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS tasks_fts")
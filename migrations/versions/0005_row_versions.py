@@ -0,0 +1,28 @@
+"""Row versions on tasks and projects
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Adds the version counters behind ETags and If-Match; existing rows start
+at version 1.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("projects") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+def downgrade():
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.drop_column("version")
+    with op.batch_alter_table("projects") as batch_op:
+        batch_op.drop_column("version")
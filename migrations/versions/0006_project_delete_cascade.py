@@ -0,0 +1,73 @@
+"""Cascade project deletes to tasks and counters
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+Recreates the foreign keys from tasks and project_task_stats to projects
+with ON DELETE CASCADE, and adds project_deletions for the progress of
+background deletes. On SQLite the tables are rebuilt, which drops the
+tasks_fts triggers, so they are created again.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Names SQLite batch mode gives the unnamed foreign keys of 0001 and 0003
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+TABLES = ("tasks", "project_task_stats")
+# The tasks_fts table and triggers as of this revision, copied so later model changes cannot alter it
+TASK_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+def _replace_project_fk(table: str, ondelete):
+    if op.get_bind().dialect.name == "sqlite":
+        name = f"fk_{table}_project_id_projects"
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_="foreignkey")
+            batch_op.create_foreign_key(name, "projects", ["project_id"], ["id"], ondelete=ondelete)
+    else:
+        name = f"{table}_project_id_fkey"
+        op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(name, table, "projects", ["project_id"], ["id"], ondelete=ondelete)
+
+def _restore_fts_triggers():
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in TASK_FTS_DDL:
+            op.execute(statement)
+
+def upgrade():
+    for table in TABLES:
+        _replace_project_fk(table, "CASCADE")
+    _restore_fts_triggers()
+    op.create_table(
+        "project_deletions",
+        sa.Column("project_id", sa.Integer(), primary_key=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("deleted", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("finished_at", sa.DateTime()),
+    )
+
+def downgrade():
+    op.drop_table("project_deletions")
+    for table in TABLES:
+        _replace_project_fk(table, None)
+    _restore_fts_triggers()
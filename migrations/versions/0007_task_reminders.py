@@ -0,0 +1,28 @@
+"""Due-date reminders queued per task
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+Adds task_reminders, where the reminder scheduler claims each reminder
+before queueing its notification.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "task_reminders",
+        sa.Column("task_id", sa.Integer(), sa.ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("kind", sa.String(), primary_key=True),
+        sa.Column("due_date", sa.DateTime(), primary_key=True),
+        sa.Column("queued_at", sa.DateTime()),
+    )
+
+def downgrade():
+    op.drop_table("task_reminders")
@@ -0,0 +1,26 @@
+"""Password version on users
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+Tokens carry the user's password_version instead of a digest of the
+stored hash, so rehashing the same password on login no longer revokes
+them. Tokens issued before this revision carry the old digest and stop
+working once.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("password_version", sa.Integer(), nullable=False, server_default="1"))
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("password_version")
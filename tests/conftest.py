@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite database before any app module is imported
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["NOTIFICATION_DISPATCHER"] = "off"
+os.environ["REMINDER_SCHEDULER"] = "off"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import pytest
+from contextlib import contextmanager
+from fastapi.testclient import TestClient
+from app import admission, cache
+from app.main import app
+from app.dependencies import token_cache
+from app.database import engine, SessionLocal, track_queries
+from app.models import Base
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    # Ids restart with every database, so lists cached by an earlier test must not leak in
+    cache.clear()
+    if admission.controller:
+        admission.controller.clear()
+    token_cache.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    with TestClient(app) as c:
+        yield c
+
+def signup_and_login(client, email="owner@example.com", password="secret123", name="Owner"):
+    client.post("/auth/signup", json={"name": name, "email": email, "password": password, "confirm_password": password})
+    response = client.post("/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def auth_headers(client):
+    return signup_and_login(client)
+
+@pytest.fixture
+def max_queries():
+    """``with max_queries(n) as stats:`` fails the test if the block runs more than n SQL statements"""
+    @contextmanager
+    def check(limit):
+        # TestClient serves requests on its own event loop thread, so count every statement
+        with track_queries(everywhere=True) as stats:
+            yield stats
+        assert stats.count <= limit, f"expected at most {limit} queries, ran {stats.report()}"
+    return check
@@ -0,0 +1,78 @@
+import asyncio
+from app import admission
+
+class FakeRedis:
+    """The slice of redis-py RedisBuckets uses; the transaction runs its commands right away"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.expiry = {}
+
+    def transaction(self, func, *watches, value_from_callable=False):
+        value = func(self)
+        return value if value_from_callable else []
+
+    def hmget(self, name, *keys):
+        values = self.hashes.get(name, {})
+        return [values.get(key) for key in keys]
+
+    def multi(self):
+        pass
+
+    def hset(self, name, mapping):
+        self.hashes.setdefault(name, {}).update({key: str(value).encode() for key, value in mapping.items()})
+
+    def pexpire(self, name, milliseconds):
+        self.expiry[name] = milliseconds
+
+def test_login_rate_limits_by_email_and_ip(client, monkeypatch):
+    now = [1000.0]
+    rules = {"POST /auth/login": admission.Rule(4, 4, 1, ip_rate=(5, 5 / 60), email_rate=(2, 2 / 60))}
+    monkeypatch.setattr(admission, "controller", admission.AdmissionController(rules, admission.MemoryBuckets(), clock=lambda: now[0]))
+
+    def login(email):
+        return client.post("/auth/login", json={"email": email, "password": "wrong-password"})
+
+    assert [login("a@example.com").status_code for _ in range(3)] == [401, 401, 429]
+    response = login("A@example.com")
+    assert response.status_code == 429 and response.headers["Retry-After"] == "30"
+    assert login("b@example.com").status_code == 401
+    # The IP's five tokens are spent, whatever the email
+    response = login("c@example.com")
+    assert response.status_code == 429 and response.headers["Retry-After"] == "12"
+    now[0] += 30
+    assert login("a@example.com").status_code == 401
+
+    text = client.get("/metrics").text
+    assert 'admission_rejections_total{route="POST /auth/login",reason="email_rate"} 2' in text
+    assert 'admission_queue_depth{route="POST /auth/login"} 0' in text
+
+def test_saturated_route_sheds_without_touching_others(client, auth_headers, monkeypatch):
+    rules = {"POST /auth/signup": admission.Rule(0, 0, 2)}
+    monkeypatch.setattr(admission, "controller", admission.AdmissionController(rules, admission.MemoryBuckets()))
+    response = client.post("/auth/signup", json={"name": "N", "email": "n@example.com", "password": "pw", "confirm_password": "pw"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "2"
+    assert client.get("/projects/", headers=auth_headers).status_code == 200
+
+def test_concurrency_limit_queues_in_order_then_sheds():
+    async def scenario():
+        limit = admission.ConcurrencyLimit(1, 1, timeout=0.05)
+        assert await limit.acquire() is None
+        waiting = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        assert limit.waiting == 1
+        assert await limit.acquire() == "queue_full"
+        limit.release()
+        assert await waiting is None and limit.active == 1
+        assert await limit.acquire() == "queue_timeout"
+        limit.release()
+        assert (limit.active, limit.waiting) == (0, 0)
+
+    asyncio.run(scenario())
+
+def test_redis_buckets_match_memory_buckets():
+    fake = FakeRedis()
+    shared, local = admission.RedisBuckets(client=fake), admission.MemoryBuckets()
+    times = [0, 0, 0, 0, 5, 10, 10, 40]
+    assert [shared.take("k", 3, 0.1, now) for now in times] == [local.take("k", 3, 0.1, now) for now in times]
+    assert fake.expiry["admission:k"] == 30000
@@ -1,5 +1,12 @@
+import time
+import pytest
 from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy import event
+from app import models, passwords
 from app.main import app
+from app.database import engine, async_engine
+from app.dependencies import Principal, TokenCache, token_cache
 
 client = TestClient(app)
 
@@ -10,4 +17,81 @@ def test_create_user_and_login():
 
     response = client.post("/token", data={"username": "test@example.com", "password": "test123"})
     assert response.status_code == 200
-    assert "access_token" in response.json()
\ No newline at end of file
+    assert "access_token" in response.json()
+
+@pytest.fixture
+def user_queries():
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+    request_engine = async_engine.sync_engine if async_engine else engine
+    event.listen(request_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(request_engine, "before_cursor_execute", record)
+    token_cache.clear()
+
+def test_cached_token_skips_user_lookup(client, auth_headers, user_queries):
+    assert client.get("/projects/", headers=auth_headers).status_code == 200
+    assert len(user_queries) == 1
+    assert client.get("/projects/", headers=auth_headers).status_code == 200
+    assert len(user_queries) == 1
+
+def test_deleting_user_revokes_cached_token(client, auth_headers, db, user_queries):
+    assert client.get("/projects/", headers=auth_headers).status_code == 200
+    db.delete(db.query(models.User).one())
+    db.commit()
+    assert client.get("/projects/", headers=auth_headers).status_code == 401
+
+def test_password_change_revokes_token(client, auth_headers, db, user_queries):
+    assert client.get("/projects/", headers=auth_headers).status_code == 200
+    user = db.query(models.User).one()
+    user.hashed_password = "changed"
+    db.commit()
+    assert client.get("/projects/", headers=auth_headers).status_code == 401
+
+def test_token_cache_is_bounded_and_expires():
+    cache = TokenCache(maxsize=2)
+    cache.put("a", Principal(id=1), time.time() + 60)
+    cache.put("b", Principal(id=2), time.time() + 60)
+    cache.put("c", Principal(id=3), time.time() - 1)
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.get("b") == Principal(id=2)
+    assert cache.get("c") is None
+    cache.invalidate_user(2)
+    assert cache.get("b") is None
+
+def test_login_upgrades_outdated_hash(client, db):
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("secret123")
+    db.add(models.User(name="Old", email="old@example.com", hashed_password=outdated))
+    db.commit()
+
+    response = client.post("/auth/login", json={"email": "old@example.com", "password": "secret123"})
+    assert response.status_code == 200
+    db.expire_all()
+    upgraded = db.query(models.User).one().hashed_password
+    assert upgraded != outdated
+    assert passwords.pwd_context.identify(upgraded) == "bcrypt" and not passwords.pwd_context.needs_update(upgraded)
+
+def test_login_rehash_keeps_other_tokens(client, db):
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("secret123")
+    db.add(models.User(name="Old", email="old@example.com", hashed_password=outdated))
+    db.commit()
+    login = {"email": "old@example.com", "password": "secret123"}
+    headers = {"Authorization": f"Bearer {client.post('/auth/login', json=login).json()['access_token']}"}
+
+    # The cost factor changes again, so the next login rehashes the same password
+    users = models.User.__table__
+    db.execute(users.update().values(hashed_password=outdated))
+    db.commit()
+    assert client.post("/auth/login", json=login).status_code == 200
+    token_cache.clear()
+    assert client.get("/projects/", headers=headers).status_code == 200
+
+def test_saturated_hash_pool_returns_503(client, monkeypatch):
+    monkeypatch.setattr(passwords, "hasher", passwords.PasswordHasher(workers=1, max_queue=0))
+    passwords.hasher._pending = 1
+    response = client.post("/auth/signup", json={"name": "A", "email": "a@example.com", "password": "pw", "confirm_password": "pw"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
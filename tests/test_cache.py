@@ -0,0 +1,76 @@
+from app import cache
+
+class FakeRedis:
+    """The slice of redis-py the list cache uses, ignoring expiry"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+def create_project(client, headers, name):
+    return client.post("/projects/", json={"name": name}, headers=headers).json()
+
+def create_task(client, headers, project_id, title):
+    task = {"title": title, "priority": 1, "due_date": "2030-01-01T09:30:00", "project_id": project_id}
+    return client.post("/tasks/", json=task, headers=headers).json()
+
+def test_list_cache_hits_and_generation_invalidation(client, auth_headers):
+    first = create_project(client, auth_headers, "First")
+    second = create_project(client, auth_headers, "Second")
+    create_task(client, auth_headers, first["id"], "A")
+
+    client.get("/projects/", headers=auth_headers)
+    assert [p["name"] for p in client.get("/projects/", headers=auth_headers).json()] == ["First", "Second"]
+    text = client.get("/metrics").text
+    assert 'list_cache_requests_total{outcome="hit"} 1' in text and 'list_cache_requests_total{outcome="miss"} 1' in text
+    client.patch(f"/projects/{first['id']}", json={"name": "Renamed"}, headers=auth_headers)
+    assert [p["name"] for p in client.get("/projects/", headers=auth_headers).json()] == ["Renamed", "Second"]
+
+    filtered = {"project_id": first["id"]}
+    client.get("/tasks/", params=filtered, headers=auth_headers)
+    client.get("/tasks/", headers=auth_headers)
+    cache.clear()
+    # A write to the second project leaves the first project's list cached
+    create_task(client, auth_headers, second["id"], "B")
+    assert [t["title"] for t in client.get("/tasks/", params=filtered, headers=auth_headers).json()] == ["A"]
+    assert [t["title"] for t in client.get("/tasks/", headers=auth_headers).json()] == ["A", "B"]
+    assert cache.stats()["misses"] == 2
+    assert [t["title"] for t in client.get("/tasks/", params=filtered, headers=auth_headers).json()] == ["A"]
+    assert cache.stats()["hits"] == 1
+
+def test_redis_backend_round_trips_rows(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(cache, "backend", cache.RedisBackend(client=FakeRedis()))
+    project = create_project(client, auth_headers, "Redis")
+    task = create_task(client, auth_headers, project["id"], "Cached")
+
+    fresh = client.get("/tasks/", params={"sort_by": "due_date", "per_page": 1}, headers=auth_headers)
+    cached = client.get("/tasks/", params={"sort_by": "due_date", "per_page": 1}, headers=auth_headers)
+    assert cached.json() == fresh.json() == [task]
+    assert cached.headers["X-Next-Cursor"] == fresh.headers["X-Next-Cursor"]
+    assert cache.stats()["hits"] == 1
+
+    client.delete(f"/tasks/{task['id']}", headers=auth_headers)
+    assert client.get("/tasks/", params={"sort_by": "due_date", "per_page": 1}, headers=auth_headers).json() == []
+
+def test_memory_backend_is_bounded_and_expires(monkeypatch):
+    backend = cache.MemoryBackend(maxsize=2, ttl=60)
+    for key in ("a", "b", "c"):
+        backend.set(key, [key])
+    assert backend.get("a") is None
+    assert backend.get("c") == ["c"]
+
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + 120)
+    assert backend.get("c") is None
@@ -0,0 +1,87 @@
+import socket
+import threading
+import pytest
+from app.email_utils import SMTPPool, build_message
+
+aiosmtpd = pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+class CountingAuthenticator:
+    def __init__(self):
+        self.logins = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, server, session, envelope, mechanism, auth_data):
+        with self._lock:
+            self.logins += 1
+        return AuthResult(success=True)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    authenticator = CountingAuthenticator()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port(), authenticator=authenticator, auth_require_tls=False)
+    controller.start()
+    try:
+        yield controller, handler, authenticator
+    finally:
+        controller.stop()
+
+def make_pool(controller, **kwargs):
+    return SMTPPool(controller.hostname, controller.port, "app@example.com", "secret", use_tls=False, **kwargs)
+
+def messages(count):
+    return [(f"user{i}@example.com", build_message("app@example.com", f"user{i}@example.com", "Subject", "Body")) for i in range(count)]
+
+def test_send_many_reuses_one_session(smtp_server):
+    controller, handler, authenticator = smtp_server
+    pool = make_pool(controller)
+    try:
+        assert pool.send_many(messages(25)) == [True] * 25
+        assert pool.send_many(messages(5)) == [True] * 5
+    finally:
+        pool.close()
+    assert len(handler.messages) == 30
+    assert authenticator.logins == 1
+
+def test_reconnects_after_dropped_session(smtp_server):
+    controller, handler, authenticator = smtp_server
+    pool = make_pool(controller)
+    try:
+        assert pool.send_many(messages(1)) == [True]
+        server, _ = pool._idle[0]
+        server.sock.shutdown(socket.SHUT_RDWR)
+        assert pool.send_many(messages(3)) == [True] * 3
+    finally:
+        pool.close()
+    assert len(handler.messages) == 4
+    assert authenticator.logins == 2
+
+def test_pool_caps_concurrent_sessions(smtp_server):
+    controller, handler, authenticator = smtp_server
+    pool = make_pool(controller, max_size=2)
+    threads = [threading.Thread(target=pool.send_many, args=(messages(5),)) for _ in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(pool._idle) <= 2
+    finally:
+        pool.close()
+    assert len(handler.messages) == 40
+    assert authenticator.logins <= 2
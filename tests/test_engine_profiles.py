@@ -0,0 +1,30 @@
+import pytest
+from app.database import create_app_engine, engine_settings
+from app.settings import load_settings
+
+def pragmas(target_engine, *names):
+    with target_engine.connect() as conn:
+        return [conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names]
+
+def test_web_profile_tunes_pool_and_sqlite(tmp_path):
+    overrides = load_settings({"DB_POOL_SIZE": "3", "SQLITE_BUSY_TIMEOUT": "1234"}).engine_overrides
+    target_engine = create_app_engine(f"sqlite:///{tmp_path / 'web.db'}", "web", overrides)
+    try:
+        assert target_engine.pool.size() == 3
+        assert target_engine.pool._max_overflow == 20
+        # synchronous=NORMAL is 1
+        assert pragmas(target_engine, "journal_mode", "synchronous", "busy_timeout") == ["wal", 1, 1234]
+    finally:
+        target_engine.dispose()
+
+def test_legacy_profile_keeps_defaults(tmp_path):
+    target_engine = create_app_engine(f"sqlite:///{tmp_path / 'legacy.db'}", "legacy")
+    try:
+        assert target_engine.pool.size() == 5
+        assert pragmas(target_engine, "journal_mode", "synchronous") == ["delete", 2]
+    finally:
+        target_engine.dispose()
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        engine_settings("turbo")
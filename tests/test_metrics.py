@@ -0,0 +1,50 @@
+import re
+import threading
+from app import metrics
+
+def sample(text, name, **labels):
+    """Value of the sample ``name`` with exactly ``labels``, or 0 if absent"""
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    line = f"{name}{{{wanted}}}" if wanted else name
+    match = re.search(rf"^{re.escape(line)} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0
+
+def test_histogram_merges_thread_shards():
+    histogram = metrics.Histogram("test_seconds", "Test", ("kind",), buckets=(0.1, 1.0))
+    try:
+        threads = [threading.Thread(target=histogram.observe, args=(value, "a")) for value in (0.05, 0.5, 0.5, 3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert histogram.render() == [
+            "# HELP test_seconds Test",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{kind="a",le="0.1"} 1',
+            'test_seconds_bucket{kind="a",le="1.0"} 3',
+            'test_seconds_bucket{kind="a",le="+Inf"} 4',
+            'test_seconds_sum{kind="a"} 4.05',
+            'test_seconds_count{kind="a"} 4',
+        ]
+    finally:
+        metrics._registry.remove(histogram)
+
+def test_metrics_endpoint_reports_routes_and_password_hashing(client, auth_headers):
+    before = client.get("/metrics").text
+    client.get("/tasks/1", headers=auth_headers)
+    client.get("/tasks/2", headers=auth_headers)
+    client.get("/no-such-route")
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    requests = "http_request_duration_seconds_count"
+    assert sample(text, requests, method="GET", route="/tasks/{id}", status=404) - sample(before, requests, method="GET", route="/tasks/{id}", status=404) == 2
+    assert sample(text, requests, method="GET", route="unmatched", status=404) >= 1
+    # The scrape itself is in flight while it renders
+    assert sample(text, "http_requests_in_flight", method="GET", route="/metrics") == 1
+    assert sample(text, "db_queries_per_request_count", route="/tasks/{id}") >= 2
+    assert sample(text, "password_hash_seconds_count", operation="hash") >= 1
+    assert sample(text, "password_hash_seconds_count", operation="verify") >= 1
+    assert sample(text, "db_pool_checkout_seconds_count", engine="sync") >= 1
+    assert "# TYPE list_cache_requests_total counter" in text
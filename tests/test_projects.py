@@ -1,4 +1,10 @@
+from datetime import datetime, timedelta
+from sqlalchemy import text
 from fastapi.testclient import TestClient
+from app import crud, deletions, models
+from conftest import signup_and_login
+from app.crud import rebuild_project_task_stats
+from app.database import SessionLocal
 from app.main import app
 
 client = TestClient(app)
@@ -12,4 +18,103 @@ def test_create_and_get_project():
 
     response = client.get("/projects/", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
-    assert len(response.json()) > 0
\ No newline at end of file
+    assert len(response.json()) > 0
+
+def test_project_stats_follow_task_writes(client, auth_headers, db):
+    project_id = client.post("/projects/", json={"name": "Stats"}, headers=auth_headers).json()["id"]
+    other_id = client.post("/projects/", json={"name": "Other"}, headers=auth_headers).json()["id"]
+    past = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    task = client.post("/tasks/", json={"title": "A", "priority": 1, "project_id": project_id, "due_date": past}, headers=auth_headers).json()
+    items = [{"title": f"B{i}", "priority": 1, "status": "completed", "project_id": project_id} for i in range(3)]
+    bulk = client.post("/tasks/bulk", json={"items": items}, headers=auth_headers).json()
+    client.patch(f"/tasks/{task['id']}", json={**task, "status": "in_progress"}, headers=auth_headers)
+    client.request("DELETE", "/tasks/bulk", json={"ids": [bulk[0]["id"]]}, headers=auth_headers)
+    client.patch("/tasks/bulk", json={"items": [{**items[1], "id": bulk[1]["id"], "project_id": other_id}]}, headers=auth_headers)
+
+    stats = client.get(f"/projects/{project_id}/stats", headers=auth_headers).json()
+    assert stats == {"project_id": project_id, "total": 2, "overdue": 1, "by_status": {"pending": 0, "in_progress": 1, "completed": 1}}
+    everything = {row["project_id"]: row for row in client.get("/projects/stats", headers=auth_headers).json()}
+    assert everything[other_id]["by_status"]["completed"] == 1
+
+    db.query(models.ProjectTaskStats).delete()
+    db.commit()
+    rebuild_project_task_stats(db)
+    assert client.get(f"/projects/{project_id}/stats", headers=auth_headers).json() == stats
+    assert client.get("/projects/999/stats", headers=auth_headers).status_code == 404
+
+
+def test_project_list_etag(client, auth_headers):
+    client.post("/projects/", json={"name": "One"}, headers=auth_headers)
+    response = client.get("/projects/", headers=auth_headers)
+    etag = response.headers["ETag"]
+    assert client.get("/projects/", headers={**auth_headers, "If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+
+    project = response.json()[0]
+    client.patch(f"/projects/{project['id']}", json={"name": "Renamed"}, headers={**auth_headers, "If-Match": '"1"'})
+    assert client.get("/projects/", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+    assert client.patch(f"/projects/{project['id']}", json={"name": "Again"}, headers={**auth_headers, "If-Match": '"1"'}).status_code == 412
+
+def add_tasks(client, headers, project_id, count):
+    items = [{"title": f"T{i}", "priority": 1, "status": "completed" if i % 3 else "pending", "project_id": project_id} for i in range(count)]
+    client.post("/tasks/bulk", json={"items": items}, headers=headers)
+
+def test_delete_project_removes_tasks_in_chunks(client, auth_headers, db, monkeypatch, max_queries):
+    monkeypatch.setattr(crud, "PROJECT_DELETE_CHUNK_SIZE", 10)
+    project_id = client.post("/projects/", json={"name": "Doomed"}, headers=auth_headers).json()["id"]
+    kept_id = client.post("/projects/", json={"name": "Kept"}, headers=auth_headers).json()["id"]
+    add_tasks(client, auth_headers, project_id, 25)
+    add_tasks(client, auth_headers, kept_id, 2)
+
+    with max_queries(20) as stats:
+        assert client.delete(f"/projects/{project_id}", headers=auth_headers).status_code == 204
+    assert sum(count for shape, count in stats.shapes.items() if shape.startswith("DELETE FROM tasks")) == 4
+    assert db.query(models.Task.project_id).distinct().all() == [(kept_id,)]
+    assert db.query(models.ProjectTaskStats.project_id).distinct().all() == [(kept_id,)]
+    assert client.get(f"/projects/{project_id}", headers=auth_headers).status_code == 404
+    assert client.delete(f"/projects/{project_id}", headers=auth_headers).status_code == 404
+
+    # The foreign keys cascade for deletes that bypass the app too
+    db.execute(text("DELETE FROM projects WHERE id = :id"), {"id": kept_id})
+    db.commit()
+    assert db.query(models.Task).count() == 0
+
+def test_large_project_is_deleted_in_background(client, auth_headers, db, monkeypatch):
+    monkeypatch.setattr(deletions, "PROJECT_DELETE_SYNC_LIMIT", 5)
+    monkeypatch.setattr(crud, "PROJECT_DELETE_CHUNK_SIZE", 4)
+    project_id = client.post("/projects/", json={"name": "Large"}, headers=auth_headers).json()["id"]
+    add_tasks(client, auth_headers, project_id, 12)
+
+    response = client.delete(f"/projects/{project_id}", headers=auth_headers)
+    assert response.status_code == 202
+    assert response.headers["Location"] == f"/projects/{project_id}/deletion"
+    assert {key: response.json()[key] for key in ("status", "total", "deleted")} == {"status": "running", "total": 12, "deleted": 0}
+
+    # TestClient runs background tasks before returning the response
+    progress = client.get(f"/projects/{project_id}/deletion", headers=auth_headers).json()
+    assert (progress["status"], progress["deleted"]) == ("completed", 12) and progress["finished_at"]
+    assert client.get(f"/projects/{project_id}", headers=auth_headers).status_code == 404
+    assert db.query(models.Task).count() == 0
+    other = signup_and_login(client, "other@example.com")
+    assert client.get(f"/projects/{project_id}/deletion", headers=other).status_code == 404
+
+def test_concurrent_background_deletes_start_one_deletion(client, auth_headers, db, monkeypatch):
+    project_id = client.post("/projects/", json={"name": "Contended"}, headers=auth_headers).json()["id"]
+    owner_id = db.query(models.User.id).scalar()
+    count = crud.count_project_tasks
+    other = []
+
+    def racing_count(session, project):
+        # Another request claims the deletion between this one's checks and its write
+        if session is db and not other:
+            second = SessionLocal()
+            try:
+                other.append(crud.start_project_deletion(second, project, owner_id)[1])
+            finally:
+                second.close()
+        return count(session, project)
+    monkeypatch.setattr(crud, "count_project_tasks", racing_count)
+
+    record, started = crud.start_project_deletion(db, project_id, owner_id)
+    assert other == [True] and not started and record.status == "running"
+    # A deletion that stopped making progress can be restarted
+    assert crud.start_project_deletion(db, project_id, owner_id, stale_after=-1)[1]
@@ -0,0 +1,108 @@
+import threading
+from datetime import datetime, timedelta
+from app import models, reminders
+
+T0 = datetime(2030, 1, 1, 8, 0)
+
+def make_scheduler(now, load=reminders._load_due, resync=timedelta(days=1)):
+    return reminders.ReminderScheduler(
+        load, clock=lambda: now[0], lead=timedelta(minutes=30), window=timedelta(hours=2), grace=timedelta(hours=1), resync=resync,
+    )
+
+def test_reminders_fire_before_and_at_due_date(client, auth_headers, db, monkeypatch):
+    now = [T0]
+    scheduler = make_scheduler(now)
+    monkeypatch.setattr(reminders, "scheduler", scheduler)
+    project = client.post("/projects/", json={"name": "Project"}, headers=auth_headers).json()
+
+    def create(title, due, **values):
+        payload = {"title": title, "priority": 1, "project_id": project["id"], "due_date": (T0 + due).isoformat(), **values}
+        return client.post("/tasks/", json=payload, headers=auth_headers).json()
+
+    a = create("a", timedelta(minutes=45))
+    b = create("b", timedelta(minutes=10))
+    c = create("c", timedelta(hours=5))
+    create("done", timedelta(minutes=20), status="completed")
+    far = [{"title": f"far {i}", "priority": 1, "project_id": project["id"], "due_date": (T0 + timedelta(days=30)).isoformat()} for i in range(50)]
+    client.post("/tasks/bulk", json={"items": far}, headers=auth_headers)
+
+    def tick(at):
+        now[0] = T0 + at
+        return reminders.fire_due(db, scheduler)
+
+    assert tick(timedelta()) == 1  # b is due within the lead time already
+    assert tick(timedelta(minutes=15)) == 2  # b is due, a is due soon
+    client.patch(f"/tasks/{a['id']}", json={"due_date": (T0 + timedelta(hours=3)).isoformat()}, headers=auth_headers)
+    e = create("e", timedelta(minutes=40))
+    assert tick(timedelta(minutes=45)) == 2  # e twice; a's old due date is skipped
+    assert tick(timedelta(hours=2, minutes=40)) == 1  # a is due soon again, from the next slice of the window
+    assert tick(timedelta(hours=3, minutes=5)) == 1
+    # Only tasks within reach of the window were ever read, never the far ones
+    assert scheduler.loaded == 4
+
+    # A restarted scheduler reads the window back without queueing anything twice
+    scheduler = make_scheduler(now)
+    monkeypatch.setattr(reminders, "scheduler", scheduler)
+    assert tick(timedelta(hours=3, minutes=5)) == 0
+    assert tick(timedelta(hours=4, minutes=40)) == 1  # c is due soon
+    client.delete(f"/tasks/{c['id']}", headers=auth_headers)
+    assert tick(timedelta(hours=5)) == 0
+
+    owner = db.query(models.User).first()
+    outbox = db.query(models.NotificationOutbox.user_id, models.NotificationOutbox.task_id, models.NotificationOutbox.event).order_by(models.NotificationOutbox.id).all()
+    assert [(task_id, event) for _, task_id, event in outbox] == [
+        (b["id"], "due_soon"), (b["id"], "due"), (a["id"], "due_soon"), (e["id"], "due_soon"), (e["id"], "due"),
+        (a["id"], "due_soon"), (a["id"], "due"), (c["id"], "due_soon"),
+    ]
+    assert {user_id for user_id, _, _ in outbox} == {owner.id}
+
+def test_window_is_read_in_slices_and_resynced():
+    now = [T0]
+    due = {1: T0 + timedelta(minutes=20), 2: T0 + timedelta(hours=2, minutes=45)}
+    calls = []
+
+    def load(start, end):
+        calls.append((start - T0, end - T0))
+        return [(task_id, due_date) for task_id, due_date in due.items() if start <= due_date < end]
+
+    scheduler = make_scheduler(now, load, resync=timedelta(hours=2))
+    assert scheduler.pop_due() == [(1, "due_soon", due[1])]
+    # Within the loaded window nothing is read again
+    now[0] = T0 + timedelta(minutes=20)
+    assert scheduler.pop_due() == [(1, "due", due[1])]
+    # Past half of it, the next slice is read
+    now[0] = T0 + timedelta(hours=1, minutes=5)
+    assert scheduler.pop_due() == []
+    assert len(scheduler) == 1
+    # A task moved beyond the window is dropped until the window reaches it
+    scheduler.update(2, T0 + timedelta(days=1), "pending")
+    assert len(scheduler) == 0
+    now[0] = T0 + timedelta(hours=2, minutes=10)
+    assert scheduler.pop_due() == []
+
+    assert calls == [
+        (timedelta(hours=-1), timedelta(hours=2, minutes=30)),
+        (timedelta(hours=2, minutes=30), timedelta(hours=3, minutes=35)),
+        (timedelta(hours=1, minutes=10), timedelta(hours=4, minutes=40)),
+    ]
+    # The resync took the loader's word over the dropped update
+    assert len(scheduler) == 1
+
+def test_writes_during_a_window_read_are_not_blocked_and_win():
+    now = [T0]
+    moved = T0 + timedelta(minutes=50)
+    writer = []
+
+    def load(start, end):
+        # A task write from another thread while the query runs, which returned the old due date
+        thread = threading.Thread(target=scheduler.update, args=(1, moved, "pending"))
+        thread.start()
+        thread.join(timeout=5)
+        writer.append(thread.is_alive())
+        return [(1, T0 + timedelta(minutes=10))]
+
+    scheduler = make_scheduler(now, load)
+    assert scheduler.pop_due() == []
+    assert writer == [False]
+    now[0] = T0 + timedelta(minutes=20)
+    assert scheduler.pop_due() == [(1, "due_soon", moved)]
@@ -0,0 +1,34 @@
+import sys
+from sqlalchemy import create_engine, func, inspect
+from sqlalchemy.pool import StaticPool
+from app import crud, models
+from app.tools import seed
+
+def run_seed(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["seed", *args])
+    seed.main()
+
+def test_seed_loads_readable_rows_and_appends(db, monkeypatch):
+    run_seed(monkeypatch, "--users", "5", "--projects", "20", "--tasks", "500", "--chunk", "64")
+    run_seed(monkeypatch, "--users", "5", "--projects", "20", "--tasks", "500", "--chunk", "64", "--drop-indexes")
+
+    assert db.query(func.count(models.User.id)).scalar() == 10
+    assert db.query(func.count(models.Task.id)).scalar() == 1000
+    assert db.query(func.sum(models.ProjectTaskStats.count)).scalar() == 1000
+    task = db.query(models.Task).filter(models.Task.id > 500, models.Task.due_date.isnot(None)).first()
+    assert isinstance(task.status, models.TaskStatus) and task.due_date.year > 2000 and task.version == 1
+    # The full-text triggers and indexes dropped for the second load are back
+    owner_id = db.query(models.Project.owner_id).filter(models.Project.id == task.project_id).scalar()
+    assert task.id in {row.id for row, _ in crud.search_tasks(db, owner_id, task.title, per_page=1000)}
+    assert {index["name"] for index in inspect(db.connection()).get_indexes("tasks")} >= {"ix_tasks_project_status_due_date", "ix_tasks_status_due_date"}
+
+def test_load_restores_synchronous_on_its_connection(db, monkeypatch):
+    # One pooled connection, so the load's connection is the next caller's too
+    single = create_engine(seed.engine.url, poolclass=StaticPool)
+    monkeypatch.setattr(seed, "engine", single)
+    with single.connect() as conn:
+        synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+    rows = iter([(i, f"User {i}", f"user{i}@example.com", "x") for i in range(1, 4)])
+    assert seed.load(models.User.__table__, ("id", "name", "email", "hashed_password"), rows, 2) == 3
+    with single.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == synchronous != 0
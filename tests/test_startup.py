@@ -0,0 +1,9 @@
+import os
+import subprocess
+import sys
+
+def test_app_import_skips_email_and_celery(tmp_path):
+    check = "import sys, app.main; print(' '.join(m for m in ('smtplib', 'email.mime.text', 'celery') if m in sys.modules))"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'startup.db'}")
+    result = subprocess.run([sys.executable, "-c", check], env=env, check=True, capture_output=True, text=True)
+    assert result.stdout.strip() == ""
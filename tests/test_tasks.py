@@ -0,0 +1,338 @@
+import json
+from datetime import datetime, timedelta
+from app import models, notifications, serialization
+from app.database import SessionLocal
+from conftest import signup_and_login
+
+def create_project(client, headers, name="Project"):
+    return client.post("/projects/", json={"name": name, "description": "Test"}, headers=headers).json()
+
+def test_create_task_queues_notification_without_sending(client, auth_headers, db, monkeypatch):
+    monkeypatch.setattr(notifications, "send_many", lambda *args: (_ for _ in ()).throw(AssertionError("sent inline")))
+    project = create_project(client, auth_headers)
+    user = db.query(models.User).first()
+
+    response = client.post("/tasks/", json={"title": "Write docs", "priority": 1, "project_id": project["id"], "assigned_user_id": user.id}, headers=auth_headers)
+    assert response.status_code == 200
+
+    outbox = db.query(models.NotificationOutbox).all()
+    assert [(entry.user_id, entry.task_id, entry.event, entry.status) for entry in outbox] == [(user.id, response.json()["id"], "assigned", "pending")]
+
+def test_update_task_queues_status_change(client, auth_headers, db):
+    project = create_project(client, auth_headers)
+    user = db.query(models.User).first()
+    payload = {"title": "Write docs", "priority": 1, "project_id": project["id"], "assigned_user_id": user.id}
+    task = client.post("/tasks/", json=payload, headers=auth_headers).json()
+
+    response = client.patch(f"/tasks/{task['id']}", json={**payload, "status": "completed"}, headers=auth_headers)
+    assert response.status_code == 200
+    events = [entry.event for entry in db.query(models.NotificationOutbox).order_by(models.NotificationOutbox.id)]
+    assert events == ["assigned", "status_changed"]
+
+def test_dispatcher_retries_with_backoff(client, auth_headers, db, monkeypatch):
+    project = create_project(client, auth_headers)
+    user = db.query(models.User).first()
+    client.post("/tasks/", json={"title": "Write docs", "priority": 1, "project_id": project["id"], "assigned_user_id": user.id}, headers=auth_headers)
+
+    results = [False, True]
+    sent_to = []
+    def fake_send_many(emails):
+        sent_to.extend(to_email for to_email, _, _ in emails)
+        return [results.pop(0) for _ in emails]
+    monkeypatch.setattr(notifications, "send_many", fake_send_many)
+
+    now = datetime.utcnow()
+    assert notifications.dispatch_pending(db, now=now) == (1, 0)
+    entry = db.query(models.NotificationOutbox).one()
+    assert entry.status == "pending" and entry.attempts == 1
+    assert entry.next_attempt_at == now + notifications.backoff_delay(1)
+
+    # Not due yet, so nothing is picked up
+    assert notifications.dispatch_pending(db, now=now) == (0, 0)
+    assert notifications.dispatch_pending(db, now=now + timedelta(hours=1)) == (1, 1)
+    db.refresh(entry)
+    assert entry.status == "sent"
+    assert sent_to == [user.email, user.email]
+
+def test_dispatchers_do_not_send_the_same_rows_twice(client, auth_headers, db, monkeypatch):
+    project = create_project(client, auth_headers)
+    user = db.query(models.User).first()
+    client.post("/tasks/", json={"title": "Write docs", "priority": 1, "project_id": project["id"], "assigned_user_id": user.id}, headers=auth_headers)
+
+    now = datetime.utcnow()
+    second = []
+    def fake_send_many(emails):
+        # Another dispatcher running while this one is sending finds the row claimed
+        other = SessionLocal()
+        try:
+            second.append(notifications.dispatch_pending(other, now=now))
+        finally:
+            other.close()
+        return [True for _ in emails]
+    monkeypatch.setattr(notifications, "send_many", fake_send_many)
+
+    assert notifications.dispatch_pending(db, now=now) == (1, 1)
+    assert second == [(0, 0)]
+    assert db.query(models.NotificationOutbox).one().status == "sent"
+
+def test_overdue_summary_groups_all_overdue_tasks_per_owner(db, monkeypatch):
+    now = datetime.utcnow()
+    owners = [models.User(name=f"Owner {i}", email=f"owner{i}@example.com", hashed_password="x") for i in range(3)]
+    db.add_all(owners)
+    db.flush()
+    projects = [models.Project(name="P", owner_id=owner.id) for owner in owners]
+    db.add_all(projects)
+    db.flush()
+    for i in range(12):
+        db.add(models.Task(title=f"Late {i}", priority=1, project_id=projects[0].id, due_date=now - timedelta(days=1)))
+    db.add(models.Task(title="Late other", priority=1, project_id=projects[1].id, due_date=now - timedelta(hours=1)))
+    db.add(models.Task(title="Done", priority=1, project_id=projects[1].id, due_date=now - timedelta(days=1), status=models.TaskStatus.completed))
+    db.add(models.Task(title="Future", priority=1, project_id=projects[2].id, due_date=now + timedelta(days=1)))
+    db.commit()
+
+    sent = {}
+    def fake_send(to_email, subject, body):
+        sent[to_email] = body
+        return True
+    monkeypatch.setattr(notifications, "send_email", fake_send)
+
+    stats = notifications.send_overdue_summaries(db, now=now, workers=2)
+    assert stats["rows_scanned"] == 13
+    assert stats["emails_sent"] == 2
+    assert set(sent) == {"owner0@example.com", "owner1@example.com"}
+    assert sent["owner0@example.com"].count("- Late") == 12
+
+def test_cursor_pagination_covers_every_sort_column(client, auth_headers, db):
+    project = create_project(client, auth_headers)
+    base = datetime(2030, 1, 1)
+    statuses = list(models.TaskStatus)
+    for i in range(23):
+        db.add(models.Task(
+            title=f"Task {i}",
+            priority=i % 3 + 1,
+            due_date=None if i % 4 == 0 else base + timedelta(days=i % 6),
+            status=statuses[i % 3],
+            project_id=project["id"],
+        ))
+    db.commit()
+    everything = client.get("/tasks/", params={"per_page": 100}, headers=auth_headers).json()
+
+    for sort_by in ("id", "priority", "due_date", "status"):
+        for order in ("asc", "desc"):
+            seen, cursor = [], None
+            while True:
+                params = {"sort_by": sort_by, "order": order, "per_page": 4}
+                if cursor:
+                    params["cursor"] = cursor
+                response = client.get("/tasks/", params=params, headers=auth_headers)
+                assert response.status_code == 200
+                seen.extend(task["id"] for task in response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            offset_order = [task["id"] for task in client.get("/tasks/", params={"sort_by": sort_by, "order": order, "per_page": 100}, headers=auth_headers).json()]
+            assert seen == offset_order
+            assert sorted(seen) == sorted(task["id"] for task in everything)
+
+def test_list_tasks_rejects_unknown_sort_and_bad_cursor(client, auth_headers):
+    assert client.get("/tasks/", params={"sort_by": "title"}, headers=auth_headers).status_code == 400
+    assert client.get("/tasks/", params={"cursor": "not-a-cursor"}, headers=auth_headers).status_code == 400
+
+def test_bulk_create_update_delete(client, auth_headers, db):
+    project = create_project(client, auth_headers)
+    other_headers = signup_and_login(client, email="other@example.com")
+    foreign = create_project(client, other_headers, name="Not mine")
+    user = db.query(models.User).filter(models.User.email == "owner@example.com").one()
+
+    items = [{"title": f"Task {i}", "priority": 1, "project_id": project["id"]} for i in range(1200)]
+    items[3]["assigned_user_id"] = user.id
+    items[5]["project_id"] = foreign["id"]
+    response = client.post("/tasks/bulk", json={"items": items}, headers=auth_headers)
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status"] for r in results].count(201) == 1199
+    assert results[5]["status"] == 404 and results[5]["id"] is None
+    assert results[4]["task"]["title"] == "Task 4"
+    created_ids = [r["id"] for r in results if r["status"] == 201]
+    assert db.query(models.Task).count() == 1199
+    assert db.query(models.NotificationOutbox).count() == 1
+
+    updates = [{**items[0], "id": created_ids[0], "title": "Renamed"}, {**items[0], "id": 999999}]
+    results = client.patch("/tasks/bulk", json={"items": updates}, headers=auth_headers).json()
+    assert [r["status"] for r in results] == [200, 404]
+    assert db.get(models.Task, created_ids[0]).title == "Renamed"
+    # A repeated id is rejected on its own instead of failing the whole batch as a conflict
+    repeated = [{**items[1], "id": created_ids[1], "title": "First"}, {**items[1], "id": created_ids[1], "title": "Second"}]
+    response = client.patch("/tasks/bulk", json={"items": repeated}, headers=auth_headers)
+    assert response.status_code == 200
+    assert [(r["status"], r["detail"]) for r in response.json()] == [(200, None), (400, "Duplicate id")]
+    db.expire_all()
+    task = db.get(models.Task, created_ids[1])
+    assert (task.title, task.version) == ("First", 2)
+
+    response = client.request("DELETE", "/tasks/bulk", json={"ids": created_ids[:600] + [999999]}, headers=auth_headers)
+    assert [r["status"] for r in response.json()].count(204) == 600
+    assert response.json()[-1]["status"] == 404
+    assert db.query(models.Task).count() == 599
+
+def test_export_streams_filtered_tasks(client, auth_headers):
+    project = create_project(client, auth_headers)
+    other_headers = signup_and_login(client, email="other@example.com")
+    foreign = create_project(client, other_headers, name="Not mine")
+    client.post("/tasks/", json={"title": "Hidden", "priority": 1, "project_id": foreign["id"]}, headers=other_headers)
+    items = [{"title": f"Task {i}", "priority": 1, "status": "completed" if i % 2 else "pending", "project_id": project["id"]} for i in range(7)]
+    client.post("/tasks/bulk", json={"items": items}, headers=auth_headers)
+
+    response = client.get("/tasks/export", params={"status": "pending"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Task 0", "Task 2", "Task 4", "Task 6"]
+    assert rows[0]["status"] == "pending"
+
+    response = client.get("/tasks/export", params={"format": "csv", "gzip": "true"}, headers=auth_headers)
+    assert response.headers["content-encoding"] == "gzip"
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,title,description,status")
+    assert len(lines) == 8
+
+    assert client.get("/tasks/export", params={"format": "xml"}, headers=auth_headers).status_code == 400
+
+def test_search_ranks_pages_and_scopes_results(client, auth_headers, db):
+    project = create_project(client, auth_headers)
+    for i in range(9):
+        description = "invoice " * (i % 3 + 1) + "for the quarterly report"
+        client.post("/tasks/", json={"title": f"Send invoice {i}", "description": description, "priority": 1, "project_id": project["id"]}, headers=auth_headers)
+    client.post("/tasks/", json={"title": "Water plants", "priority": 1, "project_id": project["id"]}, headers=auth_headers)
+    other = signup_and_login(client, "other@example.com")
+    other_project = create_project(client, other)
+    client.post("/tasks/", json={"title": "Other invoice", "priority": 1, "project_id": other_project["id"]}, headers=other)
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": "Invoices report", "per_page": 4}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/tasks/search", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        seen.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len({task["id"] for task in seen}) == 9
+    # Descriptions repeating the term more often rank first
+    assert [task["description"].count("invoice") for task in seen[:3]] == [3, 3, 3]
+
+    task = seen[0]
+    client.patch(f"/tasks/{task['id']}", json={**task, "title": "Renamed", "description": "gardening"}, headers=auth_headers)
+    found = client.get("/tasks/search", params={"q": "gardening"}, headers=auth_headers).json()
+    assert [t["id"] for t in found] == [task["id"]]
+    client.delete(f"/tasks/{task['id']}", headers=auth_headers)
+    assert client.get("/tasks/search", params={"q": "gardening"}, headers=auth_headers).json() == []
+    assert client.get("/tasks/search", params={"q": "\"(*"}, headers=auth_headers).json() == []
+    assert client.get("/tasks/search", params={"q": "invoice", "cursor": cursor or "bad"}, headers=auth_headers).status_code == 400
+
+def test_task_etags_and_if_match(client, auth_headers):
+    project = create_project(client, auth_headers)
+    task = client.post("/tasks/", json={"title": "Versioned", "priority": 1, "project_id": project["id"]}, headers=auth_headers).json()
+    assert task["version"] == 1
+
+    response = client.get(f"/tasks/{task['id']}", headers=auth_headers)
+    etag = response.headers["ETag"]
+    assert client.get(f"/tasks/{task['id']}", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+    listing = client.get("/tasks/", params={"per_page": 1}, headers=auth_headers)
+    unchanged = client.get("/tasks/", params={"per_page": 1}, headers={**auth_headers, "If-None-Match": listing.headers["ETag"]})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["X-Next-Cursor"] == listing.headers["X-Next-Cursor"]
+
+    update = {**task, "title": "Renamed"}
+    assert client.patch(f"/tasks/{task['id']}", json=update, headers={**auth_headers, "If-Match": '"7"'}).status_code == 412
+    response = client.patch(f"/tasks/{task['id']}", json=update, headers={**auth_headers, "If-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert client.patch(f"/tasks/{task['id']}", json=update, headers={**auth_headers, "If-Match": etag}).status_code == 412
+
+    assert client.get(f"/tasks/{task['id']}", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+    assert client.get("/tasks/", params={"per_page": 1}, headers={**auth_headers, "If-None-Match": listing.headers["ETag"]}).status_code == 200
+    bulk = client.patch("/tasks/bulk", json={"items": [{**update, "title": "Bulk"}]}, headers=auth_headers).json()
+    assert bulk[0]["task"]["version"] == 3
+    assert client.get(f"/tasks/{task['id']}", headers=auth_headers).headers["ETag"] == '"3"'
+
+def test_partial_patch_is_one_update(client, auth_headers, db, max_queries):
+    project = create_project(client, auth_headers)
+    user = db.query(models.User).first()
+    task = client.post("/tasks/", json={"title": "Partial", "description": "Keep me", "priority": 2, "project_id": project["id"], "assigned_user_id": user.id}, headers=auth_headers).json()
+    client.get("/projects/", headers=auth_headers)
+
+    # SQLite reads the old row first; Postgres folds it into the UPDATE
+    with max_queries(2) as stats:
+        response = client.patch(f"/tasks/{task['id']}", json={"title": "Renamed"}, headers=auth_headers)
+    assert response.json() == {**task, "title": "Renamed", "version": 2}
+    assert [shape.split()[0] for shape in stats.shapes if not shape.startswith("SELECT")] == ["UPDATE"]
+
+    response = client.patch(f"/tasks/{task['id']}", json={"status": "completed"}, headers=auth_headers)
+    assert response.json()["description"] == "Keep me"
+    events = [entry.event for entry in db.query(models.NotificationOutbox).order_by(models.NotificationOutbox.id)]
+    assert events == ["assigned", "status_changed"]
+    assert client.get(f"/projects/{project['id']}/stats", headers=auth_headers).json()["by_status"]["completed"] == 1
+
+    assert client.patch(f"/tasks/{task['id']}", json={"title": None}, headers=auth_headers).status_code == 422
+    other = create_project(client, signup_and_login(client, "other@example.com"))
+    assert client.patch(f"/tasks/{task['id']}", json={"project_id": other["id"]}, headers=auth_headers).status_code == 404
+    assert client.patch(f"/projects/{project['id']}", json={"description": "Only this"}, headers=auth_headers).json()["name"] == "Project"
+
+def test_dispatch_and_list_query_counts_do_not_grow_with_rows(client, auth_headers, db, monkeypatch, max_queries):
+    project = create_project(client, auth_headers)
+    user = db.query(models.User).first()
+    items = [{"title": f"Task {i}", "priority": 1, "project_id": project["id"], "assigned_user_id": user.id} for i in range(25)]
+    client.post("/tasks/bulk", json={"items": items}, headers=auth_headers)
+    monkeypatch.setattr(notifications, "send_many", lambda emails: [True] * len(emails))
+
+    # The claim (SQLite has no SKIP LOCKED), outbox rows, their users and their tasks: one query each, plus the status updates
+    with max_queries(5) as stats:
+        assert notifications.dispatch_pending(db) == (25, 25)
+    assert not stats.repeated(threshold=2)
+    with max_queries(2):
+        assert len(client.get("/tasks/", params={"per_page": 25}, headers=auth_headers).json()) == 25
+
+def test_server_timing_and_n_plus_one_warning_in_debug_mode(client, auth_headers, db, monkeypatch, capsys):
+    from app import database
+
+    project = create_project(client, auth_headers)
+    monkeypatch.setattr(database, "SQL_DEBUG", True)
+    response = client.get(f"/projects/{project['id']}", headers=auth_headers)
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert response.headers["Server-Timing"].endswith('desc="1 queries"')
+
+    with database.track_queries() as stats:
+        for _ in range(database.N_PLUS_ONE_THRESHOLD):
+            db.query(models.Task).filter(models.Task.id.in_([1, 2, 3])).all()
+    database.warn_repeated(stats, "test")
+    assert f"Possible N+1 in test: {database.N_PLUS_ONE_THRESHOLD}x SELECT" in capsys.readouterr().out
+
+def test_sparse_fieldsets_and_fast_encoding(client, auth_headers, monkeypatch):
+    project = create_project(client, auth_headers)
+    task = client.post("/tasks/", json={"title": "Sparse", "priority": 2, "due_date": "2030-01-01T09:30:00.250000", "project_id": project["id"]}, headers=auth_headers).json()
+    client.post("/tasks/", json={"title": "Later", "priority": 1, "project_id": project["id"]}, headers=auth_headers)
+
+    response = client.get(f"/tasks/{task['id']}", headers=auth_headers)
+    assert response.json() == task and response.headers["ETag"] == '"1"'
+    assert client.get(f"/tasks/{task['id']}", params={"fields": "title"}, headers=auth_headers).json() == {"title": "Sparse"}
+
+    params = {"fields": "id,status,title", "sort_by": "due_date", "per_page": 1}
+    first = client.get("/tasks/", params=params, headers=auth_headers)
+    # The second request is a list cache hit
+    assert client.get("/tasks/", params=params, headers=auth_headers).json() == first.json() == [{"title": "Sparse", "status": "pending", "id": task["id"]}]
+    second = client.get("/tasks/", params={**params, "cursor": first.headers["X-Next-Cursor"]}, headers=auth_headers).json()
+    assert [row["title"] for row in second] == ["Later"]
+
+    assert client.get("/projects/", params={"fields": "name"}, headers=auth_headers).json() == [{"name": "Project"}]
+    assert client.get("/tasks/", params={"fields": "id,secret"}, headers=auth_headers).status_code == 400
+    assert client.get("/projects/", params={"fields": "owner"}, headers=auth_headers).status_code == 400
+    assert client.get("/tasks/", params={"fields": ","}, headers=auth_headers).status_code == 400
+    assert client.get(f"/tasks/{task['id']}", params={"fields": " "}, headers=auth_headers).status_code == 400
+
+    row = {"status": models.TaskStatus.in_progress, "due_date": datetime(2030, 1, 1, 9, 30), "description": None}
+    fast = serialization.dumps(row)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(serialization.dumps(row)) == json.loads(fast) == {"status": "in_progress", "due_date": "2030-01-01T09:30:00", "description": None}